@@ -6,47 +6,58 @@ Tiene funciones auxiliares para generar y validar tokens.
 """
 
 
-from flask import Flask, request, jsonify
+# Libreria que nos permite interacturar con el sistema operativo desde python.
+import os
+import sys
+
+# Agregamos la carpeta raiz del proyecto al path para poder importar los modulos compartidos entre microservicios.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Arranque del microservicio (crear_app, carga del .env). Se importa antes que Flask para medir tambien el tiempo de los imports.
+from compartido import arranque
 
-# Importamos del submodulo '.security' dos funciones que sirven para trabajar con contrasenhas de forma segura
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Flask, Blueprint, request, jsonify
 
 # Importamos del modulo datetime las clases 'datetime' y 'timedelta' para manejar fechas y tiempos, para saber cuando se crea el token y cuando vence.
 from datetime import datetime, timedelta, timezone
 
-# Este modulo sirve para cargar variables de entorno desde un archivo .env al sistema o programa.
-from dotenv import load_dotenv
+# Libreria para guardar los tokens de refresco hasheados.
+import hashlib
 
-# Libreria que nos permite interacturar con el sistema operativo desde python.
-import os
+# Las librerias jwt (crear y validar tokens), werkzeug.security (hashear contrasenhas), secrets y uuid
+# se importan dentro de las funciones que las usan, asi no se cargan al arrancar el microservicio.
 
-import database
+# Limitador de peticiones compartido por los tres microservicios.
+from compartido.limitador import Regla, registrar_limitador
+from compartido.metricas import registrar_metricas
+from compartido import trazas
 
-# Importamos la libreria que sirve para crear y validar tokens.
-import jwt 
+import database
 
 
 # ==========================================================
 # SE LLAMA CLAVE SECRETA Y SE DEFINE LA EXPIRACION DEL TOKEN
 # ==========================================================
 
-# Esta funcion lee el archivo ".env", carga las variables en el entorno del sistema.
-load_dotenv()
+# La clave secreta se lee del archivo .env en crear_app().
+CLAVE_SECRETA = None
 
-# Accedemos a la variable del archivo .env y la guardamos para usarla.
-CLAVE_SECRETA = os.getenv("JWT_CLAVE_SECRETA")
+# Definimos el tiempo de expiracion del token de acceso. Es corto porque se renueva con el token de refresco (sin contrasenha).
+EXPIRACION = timedelta(minutes=15)
 
-if not CLAVE_SECRETA:
-    raise RuntimeError("JWT_CLAVE_SECRETA no definida") # (raise lanza error y detiene el programa, 'RuntimeError' error generico para problemas de ejecucion)
+# Tiempo de expiracion del token de refresco. Cada vez que se usa se cambia por uno nuevo (rotacion).
+EXPIRACION_REFRESCO = timedelta(days=30)
 
-# Definimos el tiempo de expiracion del token.
-EXPIRACION = timedelta(hours=1)
+# Cuantos segundos pueden guardar los demas microservicios la lista de sesiones revocadas antes de pedirla de nuevo.
+TTL_REVOCADOS = 30
 
 
 # =========================
 # Creamos el servidor Flask
 # =========================
-app = Flask(__name__)
+
+# Rutas del microservicio. Es un Blueprint que se agrega a la app Flask en crear_app().
+rutas = Blueprint("autenticacion", __name__)
 
 
 # ====================
@@ -54,7 +65,9 @@ app = Flask(__name__)
 # ====================
 
 # Funcion que genera un token valido al usuario para acceder al servidor.
-def generar_token(user_id, username):
+# 'sesion' identifica el login del que salio el token, si la sesion se revoca el token deja de ser valido.
+def generar_token(user_id, username, sesion):
+    import jwt
     
     # Obtenemos el momento de expiracion del token generado.
     fecha_expiracion = datetime.now(timezone.utc) + EXPIRACION
@@ -63,7 +76,9 @@ def generar_token(user_id, username):
     payload = {
         "user_id": user_id,
         "usuario": username, 
-        "expiracion": int(fecha_expiracion.timestamp()) # suma la hora actual + el tiempo que dura el token y guarda el momento de expiracion del token.
+        "sesion": sesion,
+        "expiracion": int(fecha_expiracion.timestamp()), # suma la hora actual + el tiempo que dura el token y guarda el momento de expiracion del token.
+        "exp": int(fecha_expiracion.timestamp())         # Campo estandar, con el jwt.decode rechaza el token vencido.
     }
 
     # Crea un JWT firmado con "HS256" usando la clave secreta para que nadie pueda modificar el token sin la clave secreta.(No oculta datos)
@@ -73,12 +88,18 @@ def generar_token(user_id, username):
 
 # Funcion que valida el token del usuario. Devuelve un diccionario indicando si es valido el token y el nombre de usuario.
 def validar_token(token):
+    import jwt
+
     try:
         payload = jwt.decode(token, CLAVE_SECRETA, algorithms=["HS256"]) # Decodifica el token recibido usando la clave secreta y el algortimo HS256.
         user_id = payload.get("user_id")
         username = payload.get("usuario")
         fecha_expiracion = payload.get("expiracion")
 
+        # Verificamos que la sesion de la que salio el token no este revocada.
+        if payload.get("sesion") and database.sesion_revocada(payload["sesion"]):
+            return {"valid": False, "Error": "Sesion revocada"}
+
         # Convertimos a un formato facil de leer la fecha y hora de expiracion del codigo.
         exp_legible = datetime.fromtimestamp(fecha_expiracion, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
 
@@ -93,12 +114,86 @@ def validar_token(token):
         return {"valid": False, "Error": "Token invalido"}
 
 
+# Convierte el token de refresco en el hash que se guarda en la base de datos.
+# Alcanza con SHA-256 (rapido) porque el token es aleatorio y largo, no es una contrasenha que se pueda adivinar.
+def hashear_token_refresco(token_refresco):
+    return hashlib.sha256(token_refresco.encode()).hexdigest()
+
+
+# Crea un token de refresco aleatorio. Devuelve (token, hash, fecha_expiracion).
+def generar_token_refresco():
+    import secrets
+
+    token_refresco = secrets.token_urlsafe(32)
+    fecha_expiracion = int((datetime.now(timezone.utc) + EXPIRACION_REFRESCO).timestamp())
+    return token_refresco, hashear_token_refresco(token_refresco), fecha_expiracion
+
+
+# Revoca la sesion. Queda en la lista de revocadas hasta que vence el ultimo token de acceso que pudo salir de ella.
+def revocar_sesion(sesion):
+    vence = int((datetime.now(timezone.utc) + EXPIRACION).timestamp())
+    database.revocar_sesion(sesion, vence)
+
+
+# Devuelve el user_id del token si es valido, o None. La usa el limitador para identificar al usuario.
+def usuario_del_token(token):
+    resultado = validar_token(token)
+    return resultado.get("user_id") if resultado["valid"] else None
+
+
+# =======================
+# LIMITADOR DE PETICIONES
+# =======================
+
+# Limites por endpoint. /login y /register son caros (hashean la contrasenha) y se limitan por IP.
+# /validate no se limita porque lo llaman los demas microservicios desde la misma IP.
+LIMITES = {
+    "iniciar_sesion": Regla(capacidad=5, por_segundo=0.2),      # 5 intentos seguidos, luego 1 cada 5 segundos.
+    "registrar_usuario": Regla(capacidad=3, por_segundo=0.05),  # 3 registros seguidos, luego 1 cada 20 segundos.
+    "refrescar_token": Regla(capacidad=10, por_segundo=1),      # Renovar es barato, pero igual se limita por IP.
+}
+
+
+# ============
+# CREAR LA APP
+# ============
+
+# Arma la app Flask del microservicio: carga el .env y la clave secreta, registra los middlewares y las rutas y prepara la base de datos.
+def crear_app():
+    global CLAVE_SECRETA
+
+    arranque.fin_de_imports()
+    arranque.cargar_entorno()
+
+    # Accedemos a la variable del archivo .env y la guardamos para usarla.
+    CLAVE_SECRETA = os.getenv("JWT_CLAVE_SECRETA")
+
+    if not CLAVE_SECRETA:
+        raise RuntimeError("JWT_CLAVE_SECRETA no definida") # (raise lanza error y detiene el programa, 'RuntimeError' error generico para problemas de ejecucion)
+
+    with arranque.fase("app"):
+        app = Flask(__name__)
+
+        # Las trazas y las metricas se registran antes que el limitador para medir tambien las peticiones rechazadas (429).
+        trazas.registrar_trazas(app, "autenticacion")
+        registrar_metricas(app, "autenticacion")
+        registrar_limitador(app, LIMITES, obtener_usuario=usuario_del_token)
+
+        app.register_blueprint(rutas)
+
+    # Crea las tablas solo si la base de datos no tiene la version actual del esquema.
+    with arranque.fase("base de datos"):
+        database.iniciar_db()
+
+    return app
+
+
 # ======================
 # ENDPOINTS DEL SERVIDOR
 # ======================
 
 # Funcion que registra el usuario en la base de datos.
-@app.route('/register', methods=['POST'])
+@rutas.route('/register', methods=['POST'])
 def registrar_usuario():
         # Convertimos la peticion que recibimos a un diccionario con los datos y los obtenemos.
         datos = request.get_json()
@@ -110,6 +205,7 @@ def registrar_usuario():
             return jsonify({"error": "El usuario ya existe" }), 400
         
         # Hasheamos la contrasenha(convierte la contrasenha en un codigo irreconocible) 
+        from werkzeug.security import generate_password_hash
         password_hash = generate_password_hash(password)
 
         # Guardamos en la base de datos el nombre de usuario y su contrasenha hasheada.
@@ -118,7 +214,7 @@ def registrar_usuario():
 
 
 # Funcion que valida el login del usuario y le devuelve un JTW temporal para accerder al Servicio del programa.
-@app.route('/login', methods=['POST'])
+@rutas.route('/login', methods=['POST'])
 def iniciar_sesion():
     
         # Convertimos la peticion recibida a un diccionario y obtenemos los datos del usuario que quiere iniciar sesion.
@@ -135,18 +231,95 @@ def iniciar_sesion():
             return jsonify({"Error": "Usuario no encontrado"}), 404
         
         # Accedemos al contenido de password_hash en la base de datos.(Tercera columna)
+        from werkzeug.security import check_password_hash
         password_hash = user[2] 
         if not check_password_hash(password_hash, password): # Comparamos las contrasenhas hasheadas.
             return jsonify({"Error": "Contrasenha Incorrecta"}), 401
 
-        # Generamos el token temporal y le enviamos al usuario.(user_id, username)
-        token = generar_token(user[0], username)
-        return jsonify({"token": token}), 200
+        # Cada login abre una sesion nueva. Generamos el token temporal y el token de refresco de esa sesion.(user_id, username)
+        import uuid
+        sesion = uuid.uuid4().hex
+        token = generar_token(user[0], username, sesion)
+
+        token_refresco, hash_refresco, expiracion_refresco = generar_token_refresco()
+        database.guardar_token_refresco(hash_refresco, sesion, user[0], username, expiracion_refresco)
+
+        return jsonify({"token": token, "refresh_token": token_refresco}), 200
     
 
 
+# Funcion que renueva el token de acceso usando el token de refresco (sin volver a enviar la contrasenha).
+# El token de refresco se usa una sola vez: se devuelve uno nuevo. Si alguien usa uno viejo, se revoca toda la sesion.
+@rutas.route('/refresh', methods=['POST'])
+def refrescar_token():
+
+        datos = request.get_json(silent=True) or {}
+        token_refresco = datos.get("refresh_token")
+
+        if not token_refresco:
+            return jsonify({"Error": "refresh_token requerido"}), 400
+
+        # Buscamos el token por su hash (una sola consulta con indice).
+        fila = database.buscar_token_refresco(hashear_token_refresco(token_refresco))
+
+        if not fila:
+            return jsonify({"Error": "Token de refresco invalido"}), 401
+
+        if fila["revocado"]:
+            return jsonify({"Error": "Sesion revocada"}), 401
+
+        # Un token ya usado que vuelve a aparecer puede ser robado: revocamos la sesion completa.
+        if fila["usado"]:
+            revocar_sesion(fila["sesion"])
+            return jsonify({"Error": "Token de refresco reutilizado, sesion revocada"}), 401
+
+        if fila["fecha_expiracion"] <= datetime.now(timezone.utc).timestamp():
+            return jsonify({"Error": "Token de refresco expirado"}), 401
+
+        # Rotamos el token. Si otra peticion lo uso al mismo tiempo, tambien es una reutilizacion.
+        nuevo_refresco, hash_nuevo, expiracion_nueva = generar_token_refresco()
+
+        if not database.rotar_token_refresco(fila["id"], hash_nuevo, fila["sesion"], fila["user_id"], fila["username"], expiracion_nueva):
+            revocar_sesion(fila["sesion"])
+            return jsonify({"Error": "Token de refresco reutilizado, sesion revocada"}), 401
+
+        token = generar_token(fila["user_id"], fila["username"], fila["sesion"])
+        return jsonify({"token": token, "refresh_token": nuevo_refresco}), 200
+
+
+# Funcion que cierra la sesion: revoca el token de refresco y todos los tokens de acceso que salieron de la misma sesion.
+@rutas.route('/revoke', methods=['POST'])
+def revocar_token():
+
+        datos = request.get_json(silent=True) or {}
+        token_refresco = datos.get("refresh_token")
+
+        if not token_refresco:
+            return jsonify({"Error": "refresh_token requerido"}), 400
+
+        fila = database.buscar_token_refresco(hashear_token_refresco(token_refresco))
+
+        if not fila:
+            return jsonify({"Error": "Token de refresco invalido"}), 401
+
+        revocar_sesion(fila["sesion"])
+        return jsonify({"message": "Sesion revocada"}), 200
+
+
+# Funcion que devuelve la lista de sesiones revocadas para que los demas microservicios la guarden y la consulten sin llamar a /validate.
+# Solo incluye las sesiones que todavia pueden tener tokens de acceso sin vencer, por eso la lista es chica.
+@rutas.route('/revocados', methods=['GET'])
+def listar_revocados():
+
+        sesiones = database.listar_sesiones_revocadas(int(datetime.now(timezone.utc).timestamp()))
+
+        respuesta = jsonify({"sesiones": sesiones, "ttl": TTL_REVOCADOS})
+        respuesta.headers["Cache-Control"] = f"max-age={TTL_REVOCADOS}"
+        return respuesta, 200
+
+
 # Funcion que valida el token del usuario.
-@app.route('/validate', methods=['POST'])
+@rutas.route('/validate', methods=['POST'])
 def validar_sesion():
 
         # Convierte el json que envio el usuario a un diccionario y guarda el token.   
@@ -172,6 +345,9 @@ def validar_sesion():
 # Ejecutamos la app
 if __name__ == "__main__":
 
+    app = crear_app()
+    arranque.medir_si_se_pidio("autenticacion") # Con --medir-arranque muestra los tiempos del arranque y termina.
+
     print("\n" + "="*60)
     print("Microservicio de Autenticacion")
     print("="*60)
@@ -180,6 +356,9 @@ if __name__ == "__main__":
     print("\nENDPOINTS DISPONIBLES:")
     print("POST  /register  -> Registra al usuario")
     print("POST /login -> Inicio de sesion del usuario")
+    print("POST /refresh -> Renueva el token de acceso con el token de refresco")
+    print("POST /revoke -> Revoca la sesion del token de refresco")
+    print("GET /revocados -> Lista de sesiones revocadas (para los demas microservicios)")
     print("POST /validate -> Valida el token del usuario\n")
 
     app.run(host="127.0.0.1", port=5000, debug=True) 
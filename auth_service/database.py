@@ -2,19 +2,29 @@
 """
 Creamos la base de datos con la tabla usuarios.
 Tiene funciones para crear la base de datos, guardar usuarios en la tabla y consultar usuarios de la base de datos.
+Tiene las tablas de tokens de refresco (guardados hasheados) y de sesiones revocadas.
 """
 
 import sqlite3
+import time
 from datetime import datetime
 
 DB = "auth_service.db"
 
-# Funcion que crea la base de datos y la tabla Usuarios.
+# Version del esquema, se guarda en 'PRAGMA user_version'. Si la base de datos ya la tiene, no se vuelven a crear las tablas.
+# Hay que subirla cada vez que se cambia el esquema en iniciar_db.
+VERSION_ESQUEMA = 1
+
+# Funcion que crea la base de datos y la tabla Usuarios. La llama crear_app() una vez al arrancar el microservicio.
 def iniciar_db():
 
     conexion = sqlite3.connect(DB)
     cursor = conexion.cursor()
 
+    if cursor.execute("PRAGMA user_version").fetchone()[0] >= VERSION_ESQUEMA:
+        conexion.close()
+        return
+
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS Usuarios (
         id_usuario INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -23,7 +33,33 @@ def iniciar_db():
         fecha_creacion TEXT NOT NULL
         )
     """)
-    
+
+    # Tokens de refresco. Se guarda el hash del token (nunca el token), se busca por ese hash con el indice UNIQUE.
+    # Todos los tokens que salen de un mismo login comparten la misma 'sesion'. Cada token se usa una sola vez (rotacion).
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS TokensRefresco (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        hash_token TEXT UNIQUE NOT NULL,
+        sesion TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        username TEXT NOT NULL,
+        fecha_expiracion INTEGER NOT NULL,
+        usado INTEGER DEFAULT 0,
+        revocado INTEGER DEFAULT 0
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tokens_refresco_sesion ON TokensRefresco (sesion)")
+
+    # Sesiones revocadas. Se guardan solo hasta que vence el ultimo token de acceso que pudo salir de esa sesion.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS SesionesRevocadas (
+        sesion TEXT PRIMARY KEY,
+        fecha_revocacion INTEGER NOT NULL,
+        vence INTEGER NOT NULL
+        )
+    """)
+
+    cursor.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
     conexion.commit()
     conexion.close()
 
@@ -55,7 +91,101 @@ def buscar_usuario(username):
     conexion.close()
     return user 
 
-# Inicializamos la base de datos al arrancar el microservicio.
-iniciar_db()
-print("Base de datos Inicializada Correctamente")
-print
\ No newline at end of file
+# ==================
+# TOKENS DE REFRESCO
+# ==================
+
+# Guarda un token de refresco (su hash) de la sesion del usuario.
+def guardar_token_refresco(hash_token, sesion, user_id, username, fecha_expiracion):
+
+    conexion = sqlite3.connect(DB)
+    cursor = conexion.cursor()
+
+    cursor.execute("""INSERT INTO TokensRefresco
+                (hash_token, sesion, user_id, username, fecha_expiracion)
+                VALUES (?,?,?,?,?)""",
+                (hash_token, sesion, user_id, username, fecha_expiracion))
+
+    conexion.commit()
+    conexion.close()
+
+
+# Busca un token de refresco por su hash. Devuelve un diccionario con la fila o None.
+def buscar_token_refresco(hash_token):
+
+    conexion = sqlite3.connect(DB)
+    conexion.row_factory = sqlite3.Row
+    cursor = conexion.cursor()
+
+    cursor.execute("SELECT * FROM TokensRefresco WHERE hash_token = ?", (hash_token,))
+    fila = cursor.fetchone()
+
+    conexion.close()
+    return dict(fila) if fila else None
+
+
+# Marca el token viejo como usado y guarda el nuevo de la misma sesion, en una sola transaccion.
+# Devuelve False si el token viejo ya estaba usado o revocado (otra peticion lo uso al mismo tiempo).
+def rotar_token_refresco(id_token, hash_nuevo, sesion, user_id, username, fecha_expiracion):
+
+    conexion = sqlite3.connect(DB, timeout=5)
+    cursor = conexion.cursor()
+
+    cursor.execute("UPDATE TokensRefresco SET usado = 1 WHERE id = ? AND usado = 0 AND revocado = 0", (id_token,))
+
+    if cursor.rowcount == 0:
+        conexion.rollback()
+        conexion.close()
+        return False
+
+    cursor.execute("""INSERT INTO TokensRefresco
+                (hash_token, sesion, user_id, username, fecha_expiracion)
+                VALUES (?,?,?,?,?)""",
+                (hash_nuevo, sesion, user_id, username, fecha_expiracion))
+
+    conexion.commit()
+    conexion.close()
+    return True
+
+
+# Revoca todos los tokens de refresco de una sesion y la agrega a la lista de sesiones revocadas hasta 'vence'.
+def revocar_sesion(sesion, vence):
+
+    conexion = sqlite3.connect(DB, timeout=5)
+    cursor = conexion.cursor()
+    ahora = int(time.time())
+
+    cursor.execute("UPDATE TokensRefresco SET revocado = 1 WHERE sesion = ?", (sesion,))
+    cursor.execute("INSERT OR REPLACE INTO SesionesRevocadas (sesion, fecha_revocacion, vence) VALUES (?,?,?)",
+                (sesion, ahora, vence))
+
+    conexion.commit()
+    conexion.close()
+
+
+# Devuelve True si la sesion esta revocada.
+def sesion_revocada(sesion):
+
+    conexion = sqlite3.connect(DB)
+    cursor = conexion.cursor()
+
+    cursor.execute("SELECT 1 FROM SesionesRevocadas WHERE sesion = ?", (sesion,))
+    revocada = cursor.fetchone() is not None
+
+    conexion.close()
+    return revocada
+
+
+# Devuelve la lista de sesiones revocadas que todavia importan y borra las que ya vencieron.(Mantiene la lista chica)
+def listar_sesiones_revocadas(ahora):
+
+    conexion = sqlite3.connect(DB, timeout=5)
+    cursor = conexion.cursor()
+
+    cursor.execute("DELETE FROM SesionesRevocadas WHERE vence <= ?", (ahora,))
+    cursor.execute("SELECT sesion FROM SesionesRevocadas")
+    sesiones = [fila[0] for fila in cursor.fetchall()]
+
+    conexion.commit()
+    conexion.close()
+    return sesiones
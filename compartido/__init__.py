@@ -0,0 +1,4 @@
+"""
+Modulos compartidos entre los microservicios.
+Cada microservicio agrega la carpeta raiz del proyecto a su 'sys.path' para poder importarlos.
+"""
@@ -0,0 +1,101 @@
+"""
+Arranque de los microservicios.
+
+Cada microservicio tiene una funcion crear_app() que arma la app Flask: carga el .env, registra los middlewares y las rutas
+y prepara la base de datos. Importar app.py no hace nada de eso (no crea archivos, no imprime, no lee el .env),
+asi un worker nuevo solo paga lo que realmente usa. Las librerias pesadas (requests, jwt, ...) se importan la primera vez que se usan.
+
+Las rutas se declaran en un Blueprint de Flask (@rutas.route(...)) y se agregan a la app dentro de crear_app().
+
+Modo medicion: 'python app.py --medir-arranque [--presupuesto-ms 500]' arma la app, muestra en JSON cuanto tardo cada fase
+(imports, .env, base de datos, ...) y termina sin levantar el servidor. Si se pasa del presupuesto termina con codigo 1.
+"""
+
+import argparse
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+# Momento en que se importo este modulo. Los app.py lo importan antes que Flask para poder medir el tiempo de los imports.
+_inicio = time.perf_counter()
+
+# Duracion (ms) de cada fase del arranque, en el orden en que ocurrieron.
+tiempos = {}
+
+_entorno_cargado = False
+
+
+# Carga las variables del archivo .env (una sola vez por proceso).
+def cargar_entorno():
+    global _entorno_cargado
+
+    if not _entorno_cargado:
+        with fase("entorno"):
+            from dotenv import load_dotenv # Se importa aqui para no pagar su costo al importar los modulos.
+            load_dotenv()
+        _entorno_cargado = True
+
+
+# ======
+# RUTAS
+# ======
+
+# Las rutas de cada microservicio se declaran en un Blueprint de Flask y se agregan a la app en crear_app() con app.register_blueprint().
+# Flask le antepone el nombre del Blueprint al endpoint ("tareas.listar_tareas").
+
+# Devuelve el nombre del endpoint sin el prefijo del Blueprint, es decir el nombre de la funcion de la ruta.
+# Lo usan el limitador, las metricas y las trazas, asi sus claves no dependen del Blueprint. (None si la ruta no existe)
+def nombre_endpoint(endpoint):
+    return endpoint.rpartition(".")[2] if endpoint else endpoint
+
+
+# ========
+# MEDICION
+# ========
+
+# Mide el tiempo de una fase del arranque.
+# Uso:  with arranque.fase("base de datos"): database.iniciar_bd()
+@contextmanager
+def fase(nombre):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        tiempos[nombre] = round((time.perf_counter() - inicio) * 1000, 2)
+
+
+# Guarda el tiempo que paso desde que se importo este modulo (imports de app.py). Se llama al principio de crear_app().
+def fin_de_imports():
+    tiempos.setdefault("imports", round((time.perf_counter() - _inicio) * 1000, 2))
+
+
+# Devuelve el resumen del arranque: cada fase y el total desde los imports.
+def resumen(servicio):
+    return {
+        "servicio": servicio,
+        "fases_ms": dict(tiempos),
+        "total_ms": round((time.perf_counter() - _inicio) * 1000, 2),
+    }
+
+
+# Si el programa se ejecuto con --medir-arranque, muestra el resumen en una linea JSON y termina sin levantar el servidor.
+# Con --presupuesto-ms termina con codigo 1 si el total se pasa del presupuesto.
+def medir_si_se_pidio(servicio):
+
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--medir-arranque", action="store_true")
+    parser.add_argument("--presupuesto-ms", type=float)
+    argumentos, _ = parser.parse_known_args()
+
+    if not argumentos.medir_arranque:
+        return
+
+    datos = resumen(servicio)
+    datos["presupuesto_ms"] = argumentos.presupuesto_ms
+    print(json.dumps(datos))
+
+    if argumentos.presupuesto_ms is not None and datos["total_ms"] > argumentos.presupuesto_ms:
+        sys.exit(1)
+
+    sys.exit(0)
@@ -0,0 +1,43 @@
+"""
+Cliente HTTP para las peticiones entre microservicios.
+Las peticiones identicas que se hacen al mismo tiempo comparten una sola peticion real gracias a Single-Flight.
+Solo se debe usar para peticiones de lectura (validar token, listar tareas), nunca para crear o modificar datos.
+Todas las peticiones llevan el contexto de la traza actual y se miden como un span.
+"""
+
+import json
+
+from compartido import trazas
+from compartido.single_flight import SingleFlight
+
+# Tiempo maximo (segundos) que esperamos la respuesta de otro microservicio.
+TIMEOUT_PETICION = 5
+
+# Un solo Single-Flight para todo el microservicio, asi se agrupan las peticiones de todos los hilos de Flask.
+vuelo_unico = SingleFlight(timeout=TIMEOUT_PETICION, nombre="Cliente entre servicios")
+
+
+# Convierte los headers en una tupla ordenada para poder usarlos como parte de la clave.
+def _clave_headers(headers):
+    return tuple(sorted((headers or {}).items()))
+
+
+# Hace una peticion a otro microservicio (sin agrupar), agregando el header de la traza y midiendo su duracion.
+def enviar(metodo, url, headers=None, timeout=TIMEOUT_PETICION, **kwargs):
+    import requests # Se importa en la primera peticion, no al arrancar el microservicio.
+
+    with trazas.span(f"HTTP {metodo} {url}", url=url):
+        headers = dict(headers or {}, **trazas.cabeceras_traza()) # El microservicio destino continua la traza como hijo de este span.
+        return requests.request(metodo, url, headers=headers, timeout=timeout, **kwargs)
+
+
+# Hace un GET a otro microservicio. Las llamadas con la misma URL y los mismos headers que esten en curso se agrupan.
+def peticion_get(url, headers=None, timeout=TIMEOUT_PETICION):
+    clave = ("GET", url, _clave_headers(headers))
+    return vuelo_unico.ejecutar(clave, lambda: enviar("GET", url, headers=headers, timeout=timeout), timeout=timeout)
+
+
+# Hace un POST con un cuerpo JSON a otro microservicio. Las llamadas con la misma URL y el mismo cuerpo que esten en curso se agrupan.
+def peticion_post(url, datos=None, headers=None, timeout=TIMEOUT_PETICION):
+    clave = ("POST", url, json.dumps(datos, sort_keys=True), _clave_headers(headers))
+    return vuelo_unico.ejecutar(clave, lambda: enviar("POST", url, json=datos, headers=headers, timeout=timeout), timeout=timeout)
@@ -0,0 +1,136 @@
+"""
+Registros compactos para las filas de sqlite.
+
+En lugar de crear un sqlite3.Row por fila, convertirlo a diccionario y despues recorrer la lista otra vez para convertir
+columnas (por ejemplo 'completada' de 0/1 a booleano), cada fila se convierte una sola vez en un registro con __slots__
+(sin diccionario por objeto) mientras sqlite la va leyendo.
+Las columnas del registro deben estar en el mismo orden que en el SELECT.
+
+Uso:
+    Tarea = definir_registro("Tarea", ("id", "tarea", "completada"), conversiones={"completada": bool})
+    conexion.row_factory = Tarea.desde_fila
+    cursor.execute(f"SELECT {Tarea.sql()} FROM Tareas WHERE user_id = ?", (user_id,))
+    return volcar({"tareas": cursor.fetchall()})
+"""
+
+import json
+
+
+# Clase base de todos los registros. No guarda nada, solo da los metodos comunes.
+class Registro:
+
+    __slots__ = ()
+    columnas = ()
+
+    # Devuelve la lista de columnas para el SELECT (con un prefijo opcional, por ejemplo "t." en un JOIN).
+    @classmethod
+    def sql(cls, prefijo=""):
+        return ", ".join(prefijo + columna for columna in cls.columnas)
+
+    # Convierte el registro en un diccionario (columna -> valor).
+    def a_dict(self):
+        return {columna: getattr(self, columna) for columna in self.columnas}
+
+    # Permite leer el registro como un diccionario: tarea["completada"].
+    def __getitem__(self, columna):
+        if columna not in self.columnas:
+            raise KeyError(columna)
+        return getattr(self, columna)
+
+    def __eq__(self, otro):
+        return type(self) is type(otro) and all(getattr(self, columna) == getattr(otro, columna) for columna in self.columnas)
+
+    def __repr__(self):
+        valores = ", ".join(f"{columna}={getattr(self, columna)!r}" for columna in self.columnas)
+        return f"{type(self).__name__}({valores})"
+
+
+# Convierte un valor simple de una columna a texto JSON (los tipos que devuelve sqlite, mas los booleanos de las conversiones).
+def _valor_json(valor):
+    if valor.__class__ is str:
+        return _texto_json(valor)
+    if valor is None:
+        return "null"
+    if valor is True:
+        return "true"
+    if valor is False:
+        return "false"
+    if valor.__class__ is int:
+        return int.__repr__(valor)
+    return json.dumps(valor, default=_a_json_default)
+
+
+_texto_json = json.encoder.encode_basestring_ascii
+
+
+# Crea una clase de registro con una ranura (__slots__) por columna.
+# 'conversiones' es un diccionario columna -> funcion que se aplica al leer la fila (por ejemplo {"completada": bool}).
+def definir_registro(nombre, columnas, conversiones=None):
+
+    columnas = tuple(columnas)
+    conversiones = conversiones or {}
+
+    # Generamos el __init__ y el a_json con una linea por columna (igual que hacen namedtuple y dataclasses),
+    # asi no hay un bucle ni un zip por cada fila.
+    asignaciones = "\n".join(
+        f"    self.{columna} = _{columna}({columna})" if columna in conversiones else f"    self.{columna} = {columna}"
+        for columna in columnas
+    )
+    campos_json = " + ', ' + ".join(
+        f"{_texto_json(columna) + ': '!r} + _valor_json(self.{columna})" for columna in columnas
+    )
+    codigo = (
+        f"def __init__(self, {', '.join(columnas)}):\n{asignaciones or '    pass'}\n"
+        f"def a_json(self):\n    return '{{' + {campos_json or repr('')} + '}}'\n"
+    )
+
+    espacio = {f"_{columna}": funcion for columna, funcion in conversiones.items()}
+    espacio["_valor_json"] = _valor_json
+    exec(codigo, espacio)
+
+    clase = type(nombre, (Registro,), {
+        "__slots__": columnas,
+        "__init__": espacio["__init__"],
+        "a_json": espacio["a_json"],
+        "columnas": columnas,
+    })
+
+    # Row factory de sqlite: recibe (cursor, fila) y devuelve el registro ya convertido.
+    clase.desde_fila = staticmethod(lambda cursor, fila: clase(*fila))
+
+    return clase
+
+
+# Funcion 'default' para json.dumps: convierte los registros que aparezcan dentro de otros valores.
+def _a_json_default(valor):
+    if isinstance(valor, Registro):
+        return valor.a_dict()
+    raise TypeError(f"Object of type {type(valor).__name__} is not JSON serializable")
+
+
+# Serializa a JSON un valor que puede contener registros (por ejemplo {"user_id": 1, "tareas": [Tarea, ...]}).
+# Los registros escriben su propio JSON directamente desde sus columnas, sin crear un diccionario por fila.
+def volcar(valor):
+    if isinstance(valor, Registro):
+        return valor.a_json()
+
+    if isinstance(valor, dict):
+        return "{" + ", ".join(_texto_json(str(clave)) + ": " + volcar(dato) for clave, dato in valor.items()) + "}"
+
+    if isinstance(valor, (list, tuple)):
+        return "[" + ", ".join([volcar(dato) for dato in valor]) + "]"
+
+    return _valor_json(valor)
+
+
+# Hace que jsonify de la app Flask serialice los registros directamente con volcar().
+def registrar_json(app):
+
+    from flask.json.provider import DefaultJSONProvider
+
+    class ProveedorJSON(DefaultJSONProvider):
+
+        def dumps(self, obj, **kwargs):
+            return volcar(obj)
+
+    app.json = ProveedorJSON(app)
@@ -0,0 +1,78 @@
+"""
+Identidad interna firmada.
+
+El API Gateway verifica el JWT una sola vez y envia a los microservicios el header 'X-Identidad-Interna'
+con los datos del usuario (y la IP del cliente) firmados con HMAC-SHA256 usando una clave que solo conocen los servicios.
+Los microservicios confian en ese header en lugar de volver a llamar a /validate.
+Si la clave 'CLAVE_IDENTIDAD_INTERNA' no esta definida, el header se ignora y todo funciona como antes.
+La clave se lee del entorno en cada uso, el .env lo carga crear_app() de cada microservicio (compartido/arranque.py).
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+
+from flask import request, g
+
+# Nombre del header que envia el gateway a los microservicios.
+HEADER_IDENTIDAD = "X-Identidad-Interna"
+
+# Tiempo (segundos) que es valida una identidad firmada. Es corto porque se firma una por cada peticion.
+DURACION_IDENTIDAD = 30
+
+def _clave():
+    clave = os.getenv("CLAVE_IDENTIDAD_INTERNA")
+    return clave.encode() if clave else None
+
+
+def _firma(contenido, clave):
+    return hmac.new(clave, contenido.encode(), hashlib.sha256).hexdigest()
+
+
+# Crea el valor del header con los datos recibidos. Devuelve None si no hay clave interna configurada.
+def firmar_identidad(datos):
+
+    clave = _clave()
+    if not clave:
+        return None
+
+    datos = dict(datos, expiracion=int(time.time()) + DURACION_IDENTIDAD)
+
+    # Contenido en base64 (sin '=') para que viaje en un header sin problemas. Formato: contenido.firma
+    contenido = base64.urlsafe_b64encode(json.dumps(datos, separators=(",", ":")).encode()).decode().rstrip("=")
+    return f"{contenido}.{_firma(contenido, clave)}"
+
+
+# Verifica el valor del header. Devuelve el diccionario con los datos si la firma es correcta y no vencio, o None.
+def verificar_identidad(valor):
+
+    clave = _clave()
+    if not clave or not valor or "." not in valor:
+        return None
+
+    contenido, firma = valor.rsplit(".", 1)
+
+    # compare_digest compara en tiempo constante para no dar pistas sobre la firma correcta.
+    if not hmac.compare_digest(firma, _firma(contenido, clave)):
+        return None
+
+    try:
+        relleno = "=" * (-len(contenido) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(contenido + relleno))
+    except ValueError:
+        return None
+
+    if datos.get("expiracion", 0) < time.time():
+        return None
+
+    return datos
+
+
+# Devuelve la identidad interna de la peticion actual de Flask (o None). Se verifica una sola vez por peticion.
+def identidad_de_la_peticion():
+    if "identidad_interna" not in g:
+        g.identidad_interna = verificar_identidad(request.headers.get(HEADER_IDENTIDAD))
+    return g.identidad_interna
@@ -0,0 +1,161 @@
+"""
+Limitador de peticiones (rate limiting) con Token Bucket.
+
+Cada cliente tiene un "balde" con fichas. Cada peticion gasta una ficha y el balde se vuelve a llenar a una velocidad fija.
+Si el balde esta vacio, la peticion se rechaza con 429 y el header 'Retry-After' indica cuantos segundos esperar.
+El cliente se identifica por su user_id (token verificado) o por su IP en las rutas sin autenticacion.
+Opcionalmente, antes de validar el token se revisa un limite por IP mucho mas alto (regla_previa_ip), asi una rafaga
+desde una misma IP se rechaza sin hacer la llamada de validacion.
+"""
+
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from flask import request, jsonify
+
+from compartido.arranque import nombre_endpoint
+from compartido.identidad import identidad_de_la_peticion
+
+
+# Configuracion del limite de una ruta: cuantas peticiones seguidas se permiten (capacidad) y cuantas fichas se recuperan por segundo.
+class Regla:
+
+    def __init__(self, capacidad, por_segundo):
+        self.capacidad = capacidad
+        self.por_segundo = por_segundo
+
+
+# ==============================================
+# ALMACENES DE BALDES (BACKENDS INTERCAMBIABLES)
+# ==============================================
+
+# Interfaz de los almacenes. Para compartir los limites entre procesos (por ejemplo con Redis) se crea otra clase con este metodo.
+class AlmacenBuckets(ABC):
+
+    # Gasta 'costo' fichas del balde de la clave. Devuelve (permitido, segundos_de_espera).
+    @abstractmethod
+    def consumir(self, clave, capacidad, por_segundo, costo=1):
+        pass
+
+
+# Almacen en memoria del proceso. Guarda solo dos numeros por clave activa: fichas disponibles y momento de la ultima recarga.
+class AlmacenMemoria(AlmacenBuckets):
+
+    def __init__(self, intervalo_limpieza=60):
+
+        self.intervalo_limpieza = intervalo_limpieza # Cada cuantos segundos se eliminan las claves inactivas.
+
+        self._baldes = {}                 # clave -> [fichas, ultima_recarga, tiempo_para_llenarse]
+        self._lock = threading.Lock()     # Protege los baldes entre los hilos de Flask.
+        self._ultima_limpieza = time.monotonic()
+
+
+    def consumir(self, clave, capacidad, por_segundo, costo=1):
+
+        ahora = time.monotonic()
+
+        with self._lock:
+            balde = self._baldes.get(clave)
+
+            # Un cliente nuevo empieza con el balde lleno.
+            if balde is None:
+                balde = [capacidad, ahora, capacidad / por_segundo]
+                self._baldes[clave] = balde
+
+            # Recargamos las fichas segun el tiempo que paso desde la ultima peticion (sin pasarnos de la capacidad).
+            fichas = min(capacidad, balde[0] + (ahora - balde[1]) * por_segundo)
+            balde[1] = ahora
+
+            if fichas >= costo:
+                balde[0] = fichas - costo
+                permitido, espera = True, 0
+
+            else:
+                balde[0] = fichas
+                permitido, espera = False, (costo - fichas) / por_segundo # Tiempo que falta para juntar las fichas necesarias.
+
+            if ahora - self._ultima_limpieza >= self.intervalo_limpieza:
+                self._limpiar(ahora)
+
+        return permitido, espera
+
+
+    # Elimina los baldes que ya se llenaron de nuevo, un cliente que vuelve despues empieza igual con el balde lleno.
+    def _limpiar(self, ahora):
+        inactivas = [clave for clave, (_, ultima, tiempo_llenado) in self._baldes.items()
+                    if ahora - ultima >= tiempo_llenado]
+
+        for clave in inactivas:
+            del self._baldes[clave]
+
+        self._ultima_limpieza = ahora
+
+
+    # Devuelve cuantas claves activas hay en memoria.(registro visual, ayuda a depurar)
+    def claves_activas(self):
+        with self._lock:
+            return len(self._baldes)
+
+
+# ==========
+# MIDDLEWARE
+# ==========
+
+# Registra el limitador en una app Flask. Se ejecuta antes de cada peticion.
+#   reglas: diccionario {nombre_del_endpoint: Regla} (sin el prefijo del Blueprint). Los endpoints que no estan usan 'regla_por_defecto' (None = sin limite).
+#   obtener_usuario: funcion que recibe el token y devuelve el user_id si el token es valido, o None.
+#   regla_previa_ip: limite por IP que se revisa antes de validar el token (None = sin revision previa). Debe ser mucho mas alto
+#                    que las reglas por usuario, porque muchos usuarios pueden compartir una IP (por ejemplo 127.0.0.1 entre microservicios).
+def registrar_limitador(app, reglas, obtener_usuario=None, almacen=None, regla_por_defecto=None, regla_previa_ip=None):
+
+    almacen = almacen or AlmacenMemoria()
+
+    @app.before_request
+    def limitar_peticiones():
+
+        regla = reglas.get(nombre_endpoint(request.endpoint), regla_por_defecto)
+        if regla is None:
+            return None
+
+        # Si la peticion viene del API Gateway, la identidad firmada trae la IP real del cliente y su user_id (si ya lo autentico).
+        identidad = identidad_de_la_peticion() or {}
+
+        if identidad.get("user_id"):
+            return gastar_ficha(regla, f"usuario:{identidad['user_id']}")
+
+        ip = identidad.get("ip") or request.remote_addr
+
+        # Si envio un token valido, lo identificamos solo por su user_id.
+        header_autorizacion = request.headers.get("Authorization")
+        if header_autorizacion and obtener_usuario:
+
+            # Revision previa por IP, asi una rafaga rechazada no paga la validacion del token
+            # (en tareas y notificaciones es una llamada al servicio de autenticacion).
+            if regla_previa_ip is not None:
+                rechazo = gastar_ficha(regla_previa_ip, f"previa_ip:{ip}")
+                if rechazo is not None:
+                    return rechazo
+
+            user_id = obtener_usuario(header_autorizacion.replace("Bearer ", ""))
+            if user_id:
+                return gastar_ficha(regla, f"usuario:{user_id}")
+
+        # Sin token (o con un token invalido) identificamos al cliente por su IP.
+        return gastar_ficha(regla, f"ip:{ip}")
+
+    # Gasta una ficha del balde del cliente en este endpoint. Devuelve la respuesta 429 si no habia fichas, o None.
+    def gastar_ficha(regla, clave):
+
+        permitido, espera = almacen.consumir(f"{nombre_endpoint(request.endpoint)}|{clave}", regla.capacidad, regla.por_segundo)
+
+        if not permitido:
+            respuesta = jsonify({"Error": "Demasiadas peticiones, intente mas tarde"})
+            respuesta.status_code = 429
+            respuesta.headers["Retry-After"] = str(math.ceil(espera)) # Segundos enteros que el cliente debe esperar.
+            return respuesta
+
+        return None
+
+    return almacen
@@ -0,0 +1,77 @@
+"""
+Metricas basicas de un microservicio.
+Cuenta las peticiones por endpoint y por codigo de estado, y el tiempo total de respuesta.
+Se consultan en el ENDPOINT GET /metrics (el API Gateway junta las metricas de todos los microservicios).
+"""
+
+import threading
+import time
+
+from flask import request, jsonify, g
+
+from compartido.arranque import nombre_endpoint
+
+
+class Metricas:
+
+    def __init__(self, servicio):
+
+        self.servicio = servicio
+        self.inicio = time.time()
+
+        self._endpoints = {}            # endpoint -> {"peticiones", "errores", "tiempo_total_ms", "estados": {codigo: cantidad}}
+        self._lock = threading.Lock()   # Protege los contadores entre los hilos de Flask.
+
+
+    # Suma una peticion terminada a los contadores de su endpoint.
+    def registrar(self, endpoint, estado, duracion_ms):
+        with self._lock:
+            datos = self._endpoints.setdefault(endpoint, {"peticiones": 0, "errores": 0, "tiempo_total_ms": 0.0, "estados": {}})
+            datos["peticiones"] += 1
+            datos["tiempo_total_ms"] += duracion_ms
+            datos["estados"][estado] = datos["estados"].get(estado, 0) + 1
+
+            if estado >= 500:
+                datos["errores"] += 1
+
+
+    # Devuelve una copia de los contadores lista para convertir a JSON.
+    def resumen(self):
+        with self._lock:
+            endpoints = {}
+            for endpoint, datos in self._endpoints.items():
+                endpoints[endpoint] = {
+                    "peticiones": datos["peticiones"],
+                    "errores": datos["errores"],
+                    "tiempo_promedio_ms": round(datos["tiempo_total_ms"] / datos["peticiones"], 2),
+                    "estados": {str(codigo): cantidad for codigo, cantidad in datos["estados"].items()},
+                }
+
+        return {"servicio": self.servicio,
+                "segundos_activo": int(time.time() - self.inicio),
+                "endpoints": endpoints}
+
+
+# Registra las metricas en una app Flask y agrega el ENDPOINT GET /metrics. Devuelve el objeto Metricas.
+# Se debe registrar antes que el limitador para medir tambien las peticiones rechazadas.
+def registrar_metricas(app, servicio):
+
+    metricas = Metricas(servicio)
+
+    @app.before_request
+    def iniciar_medicion():
+        g.inicio_peticion = time.perf_counter()
+
+    @app.after_request
+    def terminar_medicion(respuesta):
+        inicio = g.get("inicio_peticion")
+        endpoint = nombre_endpoint(request.endpoint)
+        if inicio is not None and endpoint != "ver_metricas":
+            metricas.registrar(endpoint or "no_encontrado", respuesta.status_code, (time.perf_counter() - inicio) * 1000)
+        return respuesta
+
+    @app.route("/metrics", methods=["GET"])
+    def ver_metricas():
+        return jsonify(metricas.resumen()), 200
+
+    return metricas
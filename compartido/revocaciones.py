@@ -0,0 +1,55 @@
+"""
+Lista de sesiones revocadas.
+
+El microservicio de Autenticacion publica en GET /revocados las sesiones revocadas cuyos tokens de acceso todavia no vencieron.
+Los demas servicios guardan esa lista en memoria y la vuelven a pedir cada 'ttl' segundos,
+asi pueden rechazar un token revocado con una busqueda en un set, sin llamar a /validate en cada peticion.
+"""
+
+import threading
+import time
+
+
+class ListaRevocacion:
+
+    def __init__(self, url, ttl=30, timeout=2):
+
+        self.url = url          # URL del ENDPOINT /revocados del microservicio de Autenticacion.
+        self.ttl = ttl          # Segundos que se usa la lista guardada antes de pedirla de nuevo.
+        self.timeout = timeout
+
+        self._sesiones = frozenset()
+        self._actualizada = 0
+        self._lock = threading.Lock()  # Solo un hilo pide la lista a la vez.
+
+
+    # Pide la lista al microservicio de Autenticacion. Si falla, seguimos usando la ultima lista que tenemos.
+    def _actualizar(self):
+        import requests # Se importa en la primera consulta, no al arrancar el servicio.
+
+        try:
+            respuesta = requests.get(self.url, timeout=self.timeout)
+            if respuesta.status_code == 200:
+                datos = respuesta.json()
+                self._sesiones = frozenset(datos.get("sesiones", []))
+                self.ttl = datos.get("ttl", self.ttl)
+
+        except requests.RequestException as error:
+            print(f"Error al obtener la lista de sesiones revocadas: {error}")
+
+        # Aunque falle, esperamos el ttl para no pedirla en cada peticion mientras el servicio esta caido.
+        self._actualizada = time.time()
+
+
+    # Devuelve True si la sesion esta en la lista de revocadas.
+    def esta_revocada(self, sesion):
+
+        if not sesion:
+            return False
+
+        if time.time() - self._actualizada >= self.ttl:
+            with self._lock:
+                if time.time() - self._actualizada >= self.ttl: # Otro hilo pudo actualizarla mientras esperabamos.
+                    self._actualizar()
+
+        return sesion in self._sesiones
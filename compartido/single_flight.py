@@ -0,0 +1,72 @@
+"""
+Single-Flight (vuelo unico).
+
+Agrupa las llamadas identicas que se hacen al mismo tiempo a otro microservicio.
+La primera llamada (lider) hace la peticion real y las demas (seguidoras) esperan y reciben el mismo resultado,
+asi una rafaga de peticiones con el mismo token genera una sola peticion a /validate o a /task.
+"""
+
+import threading
+
+
+# Representa una llamada que esta en curso. Guarda el resultado o el error para entregarselo a todos los que esperan.
+class _Llamada:
+
+    def __init__(self):
+        self.terminada = threading.Event() # Se activa cuando el lider termina la peticion.
+        self.resultado = None
+        self.error = None
+
+
+class SingleFlight:
+
+    def __init__(self, timeout=5, nombre="Single-Flight"):
+
+        self.timeout = timeout  # Tiempo maximo (segundos) que una seguidora espera el resultado del lider.
+        self.nombre = nombre
+
+        self._llamadas = {}              # Llamadas en curso, la clave identifica la peticion (metodo, url, token).
+        self._lock = threading.Lock()    # Protege el diccionario de llamadas entre hilos.
+
+
+    # Ejecuta la funcion una sola vez por clave mientras haya una llamada en curso. Devuelve el resultado compartido.
+    # Si el lider lanza un error, todas las seguidoras reciben el mismo error. Si la espera supera el timeout lanza TimeoutError.
+    def ejecutar(self, clave, funcion, timeout=None):
+
+        with self._lock:
+            llamada = self._llamadas.get(clave)
+            lider = llamada is None
+
+            # Si no hay nadie haciendo esta peticion, la registramos y nos convertimos en el lider.
+            if lider:
+                llamada = _Llamada()
+                self._llamadas[clave] = llamada
+
+        if lider:
+            try:
+                llamada.resultado = funcion()
+            except Exception as error:
+                llamada.error = error
+
+            finally:
+                # Sacamos la clave antes de avisar, asi las peticiones que lleguen despues hacen una llamada nueva.
+                with self._lock:
+                    self._llamadas.pop(clave, None)
+                llamada.terminada.set()
+
+        else:
+            # Esperamos el resultado del lider, como maximo el timeout de esta clave.
+            espera = self.timeout if timeout is None else timeout
+            if not llamada.terminada.wait(espera):
+                raise TimeoutError(f"[{self.nombre}] Tiempo de espera agotado esperando la llamada en curso")
+
+        if llamada.error is not None:
+            raise llamada.error
+
+        return llamada.resultado
+
+
+    # Devuelve cuantas llamadas distintas estan en curso ahora.(registro visual, ayuda a depurar)
+    def en_curso(self):
+        with self._lock:
+            return len(self._llamadas)
@@ -0,0 +1,192 @@
+"""
+Trazas distribuidas.
+
+Cada peticion que entra al sistema recibe un trace_id. Cada paso que mide tiempo (peticion HTTP, llamada a otro microservicio,
+consulta a la base de datos) es un "span" con su propio span_id y el span_id del paso que lo contiene (padre).
+El contexto viaja entre microservicios en el header 'traceparent' (formato W3C: 00-<trace_id>-<span_id>-<flags>).
+
+Para no gastar recursos, solo se guardan las trazas muestreadas (TRAZAS_MUESTREO, por defecto 10%).
+Los spans se guardan en memoria (GET /trazas) y opcionalmente en un archivo JSON por linea (TRAZAS_ARCHIVO).
+"""
+
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from flask import request, jsonify, g
+
+from compartido.arranque import nombre_endpoint
+
+HEADER_TRAZA = "traceparent"
+
+# Porcentaje de trazas que se guardan (0.0 a 1.0). La decision se toma en la primera peticion y viaja en el header.
+# Se vuelve a leer en registrar_trazas(), despues de que crear_app() cargo el .env.
+MUESTREO = float(os.getenv("TRAZAS_MUESTREO", "0.1"))
+
+# Archivo donde se agregan los spans terminados (uno por linea). Si no esta definido, solo se guardan en memoria.
+ARCHIVO = os.getenv("TRAZAS_ARCHIVO")
+
+# Contexto de la traza actual: (trace_id, span_id, muestreada). Cada hilo de Flask tiene su propio valor.
+_contexto = contextvars.ContextVar("contexto_traza", default=None)
+
+
+# ========
+# COLECTOR
+# ========
+
+# Guarda los ultimos spans terminados en memoria y, si se configuro, tambien en un archivo.
+class Colector:
+
+    def __init__(self, maximo=2000, archivo=None):
+        self.spans = deque(maxlen=maximo)  # Al llegar al maximo se descartan los spans mas viejos.
+        self.archivo = archivo
+        self._lock = threading.Lock()
+
+    def exportar(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+            if self.archivo:
+                with open(self.archivo, "a", encoding="utf-8") as archivo:
+                    archivo.write(json.dumps(span) + "\n")
+
+    # Devuelve los spans guardados, opcionalmente solo los de una traza.
+    def buscar(self, trace_id=None):
+        with self._lock:
+            return [span for span in self.spans if trace_id is None or span["trace_id"] == trace_id]
+
+
+colector = Colector(archivo=ARCHIVO)
+
+# Nombre del microservicio que genera los spans (se define en registrar_trazas).
+_servicio = {"nombre": "desconocido"}
+
+
+# ====================
+# FUNCIONES AUXILIARES
+# ====================
+
+def _nuevo_id(bytes_):
+    return "%0*x" % (bytes_ * 2, random.getrandbits(bytes_ * 8))
+
+
+# Lee el header traceparent. Devuelve (trace_id, span_id_padre, muestreada) o None si no viene o es invalido.
+def _leer_header(valor):
+    partes = (valor or "").split("-")
+
+    if len(partes) != 4 or len(partes[1]) != 32 or len(partes[2]) != 16:
+        return None
+
+    return partes[1], partes[2], partes[3] == "01"
+
+
+# Devuelve los headers que se deben agregar a una peticion a otro microservicio para continuar la traza actual.
+def cabeceras_traza():
+    contexto = _contexto.get()
+    if contexto is None:
+        return {}
+
+    trace_id, span_id, muestreada = contexto
+    return {HEADER_TRAZA: f"00-{trace_id}-{span_id}-{'01' if muestreada else '00'}"}
+
+
+# Devuelve el trace_id de la peticion actual (o None).
+def trace_id_actual():
+    contexto = _contexto.get()
+    return contexto[0] if contexto else None
+
+
+# Mide el tiempo de un paso dentro de la traza actual. Si la traza no se muestrea, no mide nada.
+# Uso:  with trazas.span("db obtener_tareas"): ...
+@contextmanager
+def span(nombre, **atributos):
+
+    contexto = _contexto.get()
+
+    if contexto is None or not contexto[2]:
+        yield
+        return
+
+    trace_id, padre, _ = contexto
+    span_id = _nuevo_id(8)
+    token = _contexto.set((trace_id, span_id, True)) # Los pasos que ocurran adentro seran hijos de este span.
+
+    inicio = time.time()
+    inicio_preciso = time.perf_counter()
+    error = None
+
+    try:
+        yield
+    except Exception as excepcion:
+        error = repr(excepcion)
+        raise
+
+    finally:
+        _contexto.reset(token)
+        colector.exportar({
+            "trace_id": trace_id,
+            "span_id": span_id,
+            "padre_id": padre,
+            "servicio": _servicio["nombre"],
+            "nombre": nombre,
+            "inicio": inicio,
+            "duracion_ms": round((time.perf_counter() - inicio_preciso) * 1000, 3),
+            "atributos": atributos,
+            "error": error,
+        })
+
+
+# ==========
+# MIDDLEWARE
+# ==========
+
+# Registra las trazas en una app Flask: continua la traza que viene en el header (o crea una nueva en el borde del sistema),
+# mide toda la peticion como un span y agrega el ENDPOINT GET /trazas.
+def registrar_trazas(app, servicio):
+    global MUESTREO
+
+    _servicio["nombre"] = servicio
+    MUESTREO = float(os.getenv("TRAZAS_MUESTREO", MUESTREO))
+    colector.archivo = os.getenv("TRAZAS_ARCHIVO", colector.archivo)
+
+    @app.before_request
+    def iniciar_traza():
+
+        recibido = _leer_header(request.headers.get(HEADER_TRAZA))
+
+        # Si no vino contexto, esta peticion es el borde del sistema: creamos la traza y decidimos si se muestrea.
+        if recibido is None:
+            recibido = (_nuevo_id(16), None, random.random() < MUESTREO)
+
+        trace_id, padre, muestreada = recibido
+        g.token_traza = _contexto.set((trace_id, padre, muestreada))
+
+        # Abrimos el span de la peticion completa, se cierra en cerrar_traza.
+        g.span_peticion = span(f"{request.method} {request.path}", endpoint=nombre_endpoint(request.endpoint))
+        g.span_peticion.__enter__()
+
+    @app.after_request
+    def agregar_header_traza(respuesta):
+        trace_id = trace_id_actual()
+        if trace_id:
+            respuesta.headers["X-Trace-Id"] = trace_id # El cliente puede usarlo para buscar la traza.
+        return respuesta
+
+    @app.teardown_request
+    def cerrar_traza(error=None):
+        span_peticion = g.pop("span_peticion", None)
+        if span_peticion is not None:
+            span_peticion.__exit__(None, None, None)
+
+        token = g.pop("token_traza", None)
+        if token is not None:
+            _contexto.reset(token)
+
+    @app.route("/trazas", methods=["GET"])
+    def ver_trazas():
+        return jsonify({"spans": colector.buscar(request.args.get("trace_id"))}), 200
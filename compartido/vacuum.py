@@ -0,0 +1,38 @@
+"""
+Vacuum incremental de las bases de datos sqlite.
+
+Cuando la retencion mueve filas al archivo, las paginas que quedan vacias siguen ocupando espacio en el archivo de la base de datos.
+Con auto_vacuum INCREMENTAL se pueden liberar de a poco al terminar cada retencion, sin reescribir todo el archivo como hace VACUUM.
+'PRAGMA auto_vacuum = INCREMENTAL' solo tiene efecto en bases de datos nuevas: las que ya existian se activan una vez con activar_vacuum_incremental().
+"""
+
+import sqlite3
+
+
+# Libera las paginas vacias del archivo de la base de datos.
+# Devuelve cuantas paginas libres habia antes y despues, y si se hizo el vacuum o por que no.
+def vacuum_incremental(conexion):
+    cursor = conexion.cursor()
+
+    paginas_antes = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+
+    # auto_vacuum = 2 significa INCREMENTAL. Las bases de datos creadas antes necesitan un VACUUM completo una vez para activarlo.
+    if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return {"paginas_libres_antes": paginas_antes, "paginas_libres_despues": paginas_antes, "vacuum": "auto_vacuum INCREMENTAL no activo"}
+
+    # executescript ejecuta el PRAGMA hasta el final. Con execute, el modulo sqlite3 de Python lo corta despues del primer paso
+    # (el PRAGMA no devuelve filas) y solo se libera una pagina.
+    conexion.executescript("PRAGMA incremental_vacuum")
+    paginas_despues = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+
+    return {"paginas_libres_antes": paginas_antes, "paginas_libres_despues": paginas_despues, "vacuum": "incremental"}
+
+
+# Activa auto_vacuum INCREMENTAL en una base de datos existente. Reescribe todo el archivo (VACUUM), usar fuera de horario.
+def activar_vacuum_incremental(archivo):
+    conexion = sqlite3.connect(archivo, timeout=5, isolation_level=None)
+    try:
+        conexion.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conexion.execute("VACUUM")
+    finally:
+        conexion.close()
@@ -0,0 +1,244 @@
+
+"""
+API Gateway.
+Es la unica entrada para los clientes: verifica el JWT una sola vez y reenvia la peticion al microservicio correspondiente.
+Los microservicios reciben la identidad del usuario firmada en el header 'X-Identidad-Interna' y no vuelven a llamar a /validate.
+Tiene un ENDPOINT que junta las metricas de todos los microservicios.
+"""
+
+import os
+import sys
+import threading
+
+# Agregamos la carpeta raiz del proyecto al path para poder importar los modulos compartidos entre microservicios.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Arranque del gateway (crear_app, carga del .env). Se importa antes que Flask para medir tambien el tiempo de los imports.
+from compartido import arranque
+
+from flask import Flask, Blueprint, request, jsonify, Response
+
+from datetime import datetime, timezone
+
+# Las librerias requests (reenviar las peticiones) y jwt (verificar los tokens) se importan la primera vez que se usan,
+# asi no se cargan al arrancar el gateway.
+
+from compartido.identidad import HEADER_IDENTIDAD, firmar_identidad
+from compartido.metricas import registrar_metricas
+from compartido.revocaciones import ListaRevocacion
+from compartido import trazas
+
+
+# ==========================================
+# CLAVES Y DIRECCIONES DE LOS MICROSERVICIOS
+# ==========================================
+
+# El gateway usa la misma clave que el microservicio de Autenticacion para verificar los tokens. Se lee del .env en crear_app().
+CLAVE_SECRETA = None
+
+# Prefijo de la ruta del gateway -> (direccion del microservicio, requiere token)
+SERVICIOS = {
+    "auth": ("http://127.0.0.1:5000", False),
+    "tareas": ("http://127.0.0.1:5001", True),
+    "notificaciones": ("http://127.0.0.1:5002", True),
+}
+
+TIMEOUT_PETICION = 10
+
+# Lista de sesiones revocadas (cierre de sesion, token de refresco robado). Se pide al microservicio de Autenticacion cada 30 segundos.
+lista_revocacion = ListaRevocacion(f"{SERVICIOS['auth'][0]}/revocados")
+
+# Headers que son de una sola conexion (hop-by-hop) y no se deben reenviar.
+HEADERS_EXCLUIDOS = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailers",
+                    "transfer-encoding", "upgrade", "host", "content-length", "content-encoding"}
+
+
+# Una sola sesion para todo el gateway: reutiliza las conexiones TCP con cada microservicio en lugar de abrir una por peticion.
+# Se crea en la primera peticion (obtener_sesion).
+sesion = None
+lock_sesion = threading.Lock()
+
+# Metricas del gateway (se crean en crear_app).
+metricas_gateway = None
+
+
+# =========================
+# Creamos el servidor Flask
+# =========================
+
+# Rutas del gateway. Es un Blueprint que se agrega a la app Flask en crear_app().
+rutas = Blueprint("gateway", __name__)
+
+
+# ====================
+# FUNCIONES AUXILIARES
+# ====================
+
+# Devuelve la sesion de requests del gateway, la crea la primera vez.
+def obtener_sesion():
+    global sesion
+
+    if sesion is None:
+        with lock_sesion:
+            if sesion is None: # Otro hilo pudo crearla mientras esperabamos.
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                nueva = requests.Session()
+                nueva.mount("http://", HTTPAdapter(pool_connections=len(SERVICIOS), pool_maxsize=50))
+                sesion = nueva
+
+    return sesion
+
+
+# Verifica el JWT localmente con la clave secreta. Devuelve el payload si es valido y no vencio, o None.
+def verificar_token(token):
+    import jwt
+
+    try:
+        payload = jwt.decode(token, CLAVE_SECRETA, algorithms=["HS256"])
+    except jwt.InvalidTokenError:
+        return None
+
+    # El microservicio de Autenticacion guarda el vencimiento en el campo 'expiracion'.
+    if payload.get("expiracion", 0) < datetime.now(timezone.utc).timestamp():
+        return None
+
+    # El token es valido, pero su sesion pudo haberse revocado.
+    if lista_revocacion.esta_revocada(payload.get("sesion")):
+        return None
+
+    return payload
+
+
+# Reenvia la peticion actual al microservicio y devuelve su respuesta al cliente.
+def reenviar(url_base, ruta, identidad):
+    import requests
+
+    headers = {clave: valor for clave, valor in request.headers.items()
+            if clave.lower() not in HEADERS_EXCLUIDOS | {HEADER_IDENTIDAD.lower(), trazas.HEADER_TRAZA}}
+
+    # Firmamos la identidad del usuario (y la IP real del cliente, para el limitador de peticiones).
+    headers[HEADER_IDENTIDAD] = firmar_identidad(identidad)
+
+    try:
+        with trazas.span(f"HTTP {request.method} {url_base}/{ruta}", url=url_base):
+            headers.update(trazas.cabeceras_traza()) # El microservicio continua la traza como hijo de este span.
+            respuesta = obtener_sesion().request(request.method, f"{url_base}/{ruta}",
+                                    params=list(request.args.items(multi=True)),
+                                    data=request.get_data(),
+                                    headers=headers,
+                                    timeout=TIMEOUT_PETICION)
+
+    except requests.RequestException as error:
+        print(f"Error al reenviar la peticion a {url_base}: {error}")
+        return jsonify({"Error": "Servicio no disponible"}), 503
+
+    headers_respuesta = [(clave, valor) for clave, valor in respuesta.headers.items()
+                        if clave.lower() not in HEADERS_EXCLUIDOS]
+
+    return Response(respuesta.content, status=respuesta.status_code, headers=headers_respuesta)
+
+
+# ======================
+# ENDPOINTS DEL SERVIDOR
+# ======================
+
+# Funcion que recibe todas las peticiones de los clientes y las envia al microservicio que corresponde segun el prefijo.
+# Ejemplo: GET /tareas/task -> GET http://127.0.0.1:5001/task
+@rutas.route("/<servicio>/<path:ruta>", methods=["GET", "POST", "PUT", "DELETE"])
+def enrutar(servicio, ruta):
+
+    if servicio not in SERVICIOS:
+        return jsonify({"Error": "Servicio no encontrado"}), 404
+
+    url_base, requiere_token = SERVICIOS[servicio]
+    identidad = {"ip": request.remote_addr}
+
+    if requiere_token:
+        header_autorizacion = request.headers.get("Authorization")
+
+        if not header_autorizacion:
+            return jsonify({"Error": "Token requerido"}), 401
+
+        # Verificamos el token una sola vez aqui, los microservicios confian en la identidad firmada.
+        payload = verificar_token(header_autorizacion.replace("Bearer ", ""))
+
+        if not payload:
+            return jsonify({"Error": "Token invalido"}), 401
+
+        identidad["user_id"] = payload.get("user_id")
+        identidad["username"] = payload.get("usuario")
+
+    return reenviar(url_base, ruta, identidad)
+
+
+# Funcion que junta las metricas del gateway y de todos los microservicios en una sola respuesta.
+@rutas.route("/metrics/todos", methods=["GET"])
+def metricas_generales():
+    import requests
+
+    resultado = {}
+
+    for nombre, (url_base, _) in SERVICIOS.items():
+        try:
+            respuesta = obtener_sesion().get(f"{url_base}/metrics", timeout=TIMEOUT_PETICION)
+            resultado[nombre] = respuesta.json() if respuesta.status_code == 200 else {"Error": f"Estado {respuesta.status_code}"}
+
+        except requests.RequestException:
+            resultado[nombre] = {"Error": "Servicio no disponible"}
+
+    resultado["gateway"] = metricas_gateway.resumen()
+
+    return jsonify(resultado), 200
+
+
+# ============
+# CREAR LA APP
+# ============
+
+# Arma la app Flask del gateway: carga el .env y las claves, y registra los middlewares y las rutas.
+def crear_app():
+    global CLAVE_SECRETA, metricas_gateway
+
+    arranque.fin_de_imports()
+    arranque.cargar_entorno()
+
+    CLAVE_SECRETA = os.getenv("JWT_CLAVE_SECRETA")
+
+    if not CLAVE_SECRETA:
+        raise RuntimeError("JWT_CLAVE_SECRETA no definida")
+
+    if not os.getenv("CLAVE_IDENTIDAD_INTERNA"):
+        raise RuntimeError("CLAVE_IDENTIDAD_INTERNA no definida") # Sin esta clave los microservicios no pueden confiar en el gateway.
+
+    with arranque.fase("app"):
+        app = Flask(__name__)
+
+        # El gateway es el borde del sistema: aqui se crean los trace_id que luego viajan a los microservicios.
+        trazas.registrar_trazas(app, "gateway")
+        metricas_gateway = registrar_metricas(app, "gateway")
+
+        app.register_blueprint(rutas)
+
+    return app
+
+
+if __name__ == "__main__":
+
+    app = crear_app()
+    arranque.medir_si_se_pidio("gateway") # Con --medir-arranque muestra los tiempos del arranque y termina.
+
+    print("\n" + "="*60)
+    print("API Gateway")
+    print("="*60)
+    print("IP: 127.0.0.1")
+    print("Puerto: 8000")
+    print("\nENDPOINTS DISPONIBLES:")
+    print("*   /auth/<ruta>  -> Microservicio de Autenticacion (sin token)")
+    print("*   /tareas/<ruta>  -> Microservicio de Tareas")
+    print("*   /notificaciones/<ruta>  -> Microservicio de Recordatorios")
+    print("GET /metrics -> Metricas del gateway")
+    print("GET /metrics/todos -> Metricas de todos los microservicios\n")
+
+    app.run(host="127.0.0.1", port=8000, debug=True)
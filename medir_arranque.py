@@ -0,0 +1,94 @@
+
+"""
+Mide el arranque en frio de cada microservicio y verifica que no se pase del presupuesto.
+
+Cada medicion es un proceso nuevo de Python (como un worker recien creado) que ejecuta 'app.py --medir-arranque'
+en una carpeta temporal vacia: el primer arranque crea las bases de datos, los siguientes ya las encuentran con el esquema actual.
+Se mide el tiempo total del proceso (desde que se lanza hasta que la app esta armada) y se muestran las fases que informa cada servicio.
+
+Uso (desde la raiz del proyecto):
+    python medir_arranque.py [--presupuesto-ms 800] [--repeticiones 3] [--servicio tareas]
+Termina con codigo 1 si el mejor arranque de algun microservicio se pasa del presupuesto.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+# Nombre del servicio -> carpeta donde esta su app.py
+SERVICIOS = {
+    "autenticacion": "auth_service",
+    "tareas": "task_service",
+    "notificaciones": "notification_service",
+    "gateway": "gateway",
+}
+
+
+# Ejecuta un arranque en un proceso nuevo. Devuelve (milisegundos del proceso, resumen que informo el servicio).
+def arrancar(carpeta_servicio, carpeta_trabajo, entorno):
+
+    inicio = time.perf_counter()
+    proceso = subprocess.run(
+        [sys.executable, os.path.join(RAIZ, carpeta_servicio, "app.py"), "--medir-arranque"],
+        cwd=carpeta_trabajo, env=entorno, capture_output=True, text=True,
+    )
+    duracion = (time.perf_counter() - inicio) * 1000
+
+    if proceso.returncode != 0:
+        raise RuntimeError(f"{carpeta_servicio} no pudo arrancar:\n{proceso.stderr}")
+
+    # El resumen es la ultima linea que imprime el servicio.
+    return duracion, json.loads(proceso.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide el arranque en frio de los microservicios")
+    parser.add_argument("--presupuesto-ms", type=float, default=800, help="Tiempo maximo de arranque de cada microservicio")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Arranques por microservicio (se compara el mejor)")
+    parser.add_argument("--servicio", choices=SERVICIOS, help="Medir solo este microservicio")
+    argumentos = parser.parse_args()
+
+    # Los servicios no arrancan sin las claves. Si no estan en el entorno ni en el .env, usamos claves de prueba.
+    entorno = dict(os.environ)
+    if not os.path.exists(os.path.join(RAIZ, ".env")):
+        entorno.setdefault("JWT_CLAVE_SECRETA", "clave-de-medicion")
+        entorno.setdefault("CLAVE_IDENTIDAD_INTERNA", "clave-de-medicion")
+
+    servicios = [argumentos.servicio] if argumentos.servicio else list(SERVICIOS)
+    resultados = {}
+    aprobado = True
+
+    for servicio in servicios:
+        with tempfile.TemporaryDirectory() as carpeta_trabajo:
+            arranques = [arrancar(SERVICIOS[servicio], carpeta_trabajo, entorno) for _ in range(argumentos.repeticiones)]
+
+        primero = arranques[0]
+        mejor = min(arranques, key=lambda arranque: arranque[0])
+
+        resultados[servicio] = {
+            "primer_arranque_ms": round(primero[0], 1),     # Crea las bases de datos.
+            "mejor_arranque_ms": round(mejor[0], 1),        # Bases de datos ya creadas.
+            "fases_primer_arranque_ms": primero[1]["fases_ms"],
+            "fases_mejor_arranque_ms": mejor[1]["fases_ms"],
+        }
+
+        if mejor[0] > argumentos.presupuesto_ms:
+            aprobado = False
+
+    print(json.dumps(resultados, indent=2))
+
+    if not aprobado:
+        print(f"Algun microservicio tarda mas de {argumentos.presupuesto_ms} ms en arrancar")
+        sys.exit(1)
+
+    print(f"Todos los microservicios arrancan en menos de {argumentos.presupuesto_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
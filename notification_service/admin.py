@@ -0,0 +1,57 @@
+
+"""
+Comandos de administracion de la base de datos del microservicio de Recordatorios.
+Uso (desde la carpeta notification_service):
+    python admin.py retencion --dias 30 [--lote 500] [--simular]   -> Mueve los recordatorios viejos al archivo.
+    python admin.py activar-vacuum   -> Activa auto_vacuum INCREMENTAL en una base de datos existente (reescribe el archivo).
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Agregamos la carpeta raiz del proyecto al path para poder importar los modulos compartidos entre microservicios.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compartido import arranque
+
+# Cargamos el .env igual que crear_app(), asi los comandos corren con la misma configuracion que el microservicio.
+# (La base de datos de recordatorios todavia no lee variables de entorno, pero si se agrega alguna los comandos ya la ven.)
+arranque.cargar_entorno()
+
+import database
+
+
+# Comando que archiva los recordatorios de hace mas de N dias y muestra las estadisticas.
+def comando_retencion(argumentos):
+    database.crear_tabla()
+    estadisticas = database.archivar_recordatorios(argumentos.dias, lote=argumentos.lote, simular=argumentos.simular)
+
+    if argumentos.simular:
+        print("Simulacion: no se movio ningun recordatorio")
+    print(json.dumps(estadisticas, indent=2))
+
+
+# Comando que activa el vacuum incremental en una base de datos creada antes de la retencion.
+def comando_activar_vacuum(argumentos):
+    database.crear_tabla()
+    database.activar_vacuum_incremental()
+    print("auto_vacuum INCREMENTAL activado")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Administracion de la base de datos de recordatorios")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    retencion = subcomandos.add_parser("retencion", help="Mueve los recordatorios viejos a la base de datos de archivo")
+    retencion.add_argument("--dias", type=int, required=True, help="Archiva los recordatorios de hace mas de estos dias")
+    retencion.add_argument("--lote", type=int, default=500, help="Cantidad de recordatorios por transaccion")
+    retencion.add_argument("--simular", action="store_true", help="Solo muestra cuantos recordatorios se moverian")
+    retencion.set_defaults(funcion=comando_retencion)
+
+    subcomandos.add_parser("activar-vacuum", help="Activa auto_vacuum INCREMENTAL (reescribe todo el archivo)").set_defaults(funcion=comando_activar_vacuum)
+
+    argumentos = parser.parse_args()
+    argumentos.funcion(argumentos)
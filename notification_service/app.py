@@ -4,13 +4,45 @@ Microservicio de Recordatorios.
 Tiene ENDPOINTS para generar recordatorios, y listar tareas pendientes para devolverlas al cliente.
 """
 
-from flask import Flask, request, jsonify
-import requests
+import os
+import sys
+
+# Agregamos la carpeta raiz del proyecto al path para poder importar los modulos compartidos entre microservicios.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Arranque del microservicio (crear_app). Se importa antes que Flask para medir tambien el tiempo de los imports.
+from compartido import arranque
+
+from flask import Flask, Blueprint, request, jsonify, g
+
+from datetime import datetime, timezone
+import threading
+import time
+
+# Cliente para hacer peticiones a los demas microservicios (agrupa las peticiones identicas en curso).
+from compartido import cliente_servicios
+
+# Limitador de peticiones compartido por los tres microservicios.
+from compartido.limitador import Regla, registrar_limitador
+
+# Identidad firmada que envia el API Gateway y metricas del servicio.
+from compartido.identidad import HEADER_IDENTIDAD, identidad_de_la_peticion
+from compartido.metricas import registrar_metricas
+
+# Trazas distribuidas (miden el tiempo de cada llamada a otros microservicios y a la base de datos).
+from compartido import trazas
+
+# Serializacion a JSON de los registros que devuelve la base de datos.
+from compartido.filas import registrar_json
+
 import database
 
 # Importamos desde el archivo circuit_breaker la clase Circuit Breaker.
 from circuit_breaker import CircuitBreaker  
 
+# Cache con la ultima respuesta correcta de los otros microservicios, se usa cuando fallan.
+from cache_respaldo import CacheRespaldo
+
 # Circuit Breaker que protege las peticiones al microservicio de Autenticación.
 # Si el servicio falla 3 veces seguidas, el circuito se abre y deja de enviar peticiones al microservicio de Autenticacion.
 # Luego de 10 segundos, permite una petición de prueba para ver si el microservicio se recuperó.
@@ -24,25 +56,363 @@ cb_tarea = CircuitBreaker(max_fallos=3,
                         nombre="Microservicio Tareas") 
 
 
-# Creamos el servidor Flask
-app = Flask(__name__)
+# Ultima lista de tareas de cada usuario y ultimos tokens validados (hasta que vencen).
+# Se devuelven con el header 'X-Datos-Obsoletos' cuando el circuito esta abierto o la llamada falla.
+cache_tareas = CacheRespaldo(maximo=1000, nombre="Tareas")
+cache_tokens = CacheRespaldo(maximo=5000, nombre="Tokens")
+cache_vencimientos = CacheRespaldo(maximo=1000, nombre="Vencimientos")
+
+# (cache, usuario) con una actualizacion programada en segundo plano.
+refrescos_pendientes = set()
+lock_refrescos = threading.Lock()
 
-# Inicializamos nuestra base de datos.
-database.crear_tabla()
-print("Base de datos inicializada correctamente")
-print()
+
+# Rutas del microservicio. Es un Blueprint que se agrega a la app Flask en crear_app().
+rutas = Blueprint("notificaciones", __name__)
 
 # Definimos la URL del microservicio de Autenticacion y Tareas, que apuntan a los ENDPOINTS de validar sesion del usuario y listar tareas.
 URL_SERVICE_AUTH ="http://127.0.0.1:5000/validate"
 URL_SERVICE_TASK = "http://127.0.0.1:5001/task"
+URL_SERVICE_VENCIMIENTOS = "http://127.0.0.1:5001/tasks/vencimientos"
+
+# El recordatorio avisa las tareas vencidas y las que vencen en las proximas VENTANA_RECORDATORIO_HORAS horas.
+VENTANA_RECORDATORIO_HORAS = 24
+
+# Cantidad maxima de tareas que se nombran en el mensaje por cada lista (vencidas y por vencer).
+TAREAS_EN_MENSAJE = 3
+
+# =====================
+# FUNCIONES AUXILIARES
+# =====================
+
+# Guarda el momento (timestamp) en que vence el token, a partir de la respuesta de /validate.
+def _vencimiento_token(datos_autenticacion):
+    try:
+        vence = datetime.strptime(datos_autenticacion.get("token expira en(Horario Global)", ""), "%Y-%m-%d %H:%M:%S UTC")
+        return vence.replace(tzinfo=timezone.utc).timestamp()
+
+    except ValueError:
+        return time.time() # Sin fecha de vencimiento no guardamos el token en el cache de respaldo.
+
+
+# Marca la respuesta actual como obsoleta (datos del cache de respaldo). Se avisa al cliente con un header.
+def _marcar_obsoleta(edad):
+    g.edad_datos_obsoletos = max(edad, g.get("edad_datos_obsoletos", 0))
+
+
+# Valida el token del usuario. Devuelve el diccionario con los datos del usuario o None si no se pudo validar.
+def validar_token(token):
+
+    # Si la peticion viene del API Gateway, el token ya fue verificado y confiamos en la identidad firmada (no llamamos a /validate).
+    identidad = identidad_de_la_peticion()
+    if identidad and identidad.get("user_id"):
+        return {"valid": True, "user_id": identidad["user_id"], "username": identidad.get("username")}
+
+    # Si el token ya se valido en esta misma peticion (por ejemplo en el limitador), reutilizamos el resultado.
+    validados = g.setdefault("tokens_validados", {})
+    if token not in validados:
+        validados[token] = _validar_token_remoto(token)
+
+    return validados[token]
+
+
+# Single-Flight va por fuera del Circuit Breaker: las peticiones identicas en curso comparten una sola llamada protegida,
+# asi el circuit breaker cuenta una sola vez cada peticion real.
+def _validar_token_remoto(token):
+    try:
+        respuesta = cliente_servicios.vuelo_unico.ejecutar(
+            ("VALIDATE", token),
+            lambda: cb_autenticacion.ejecutar(lambda: cliente_servicios.enviar("POST", URL_SERVICE_AUTH, json={"token": token})))
+
+    # La peticion en curso tardo mas que el timeout, la tratamos igual que un fallo.
+    except TimeoutError as error:
+        print(f"Error al validar token: {error}")
+        respuesta = None
+
+    # El microservicio no respondio (fallo, timeout o circuito abierto): usamos la ultima validacion si el token todavia no vencio.
+    if respuesta is None:
+        copia = cache_tokens.obtener(token)
+        if copia is None:
+            return None
+
+        datos_autenticacion, edad = copia
+        _marcar_obsoleta(edad)
+        return datos_autenticacion
+
+    # El microservicio respondio que el token no es valido.
+    if respuesta.status_code != 200:
+        return None
+
+    datos_autenticacion = respuesta.json()
+    cache_tokens.guardar(token, datos_autenticacion, vence=_vencimiento_token(datos_autenticacion))
+    return datos_autenticacion
+
+
+# Pide las tareas al microservicio de Tareas a traves del Circuit Breaker. Devuelve la respuesta o None si fallo.
+def _pedir_tareas(headers):
+    return cb_tarea.ejecutar(lambda: cliente_servicios.enviar("GET", URL_SERVICE_TASK, headers=headers))
+
+
+# Pide las tareas vencidas y por vencer al microservicio de Tareas a traves del Circuit Breaker. Devuelve la respuesta o None si fallo.
+def _pedir_vencimientos(headers):
+    parametros = {"ventana_horas": VENTANA_RECORDATORIO_HORAS, "limite": TAREAS_EN_MENSAJE}
+    return cb_tarea.ejecutar(lambda: cliente_servicios.enviar("GET", URL_SERVICE_VENCIMIENTOS, headers=headers, params=parametros))
+
+
+# Lo que se guarda en el cache de respaldo de cada respuesta del microservicio de Tareas.
+def _tareas_de_respuesta(datos):
+    return datos.get("tareas", [])
+
+
+# Headers para las peticiones al microservicio de Tareas.
+def _headers_tareas(token):
+
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Reenviamos la identidad firmada del gateway para que el microservicio de Tareas tampoco llame a /validate.
+    identidad = request.headers.get(HEADER_IDENTIDAD)
+    if identidad:
+        headers[HEADER_IDENTIDAD] = identidad
+
+    return headers
+
+
+# Obtiene la lista de tareas del usuario desde el microservicio de Tareas. Devuelve None si no se pudo obtener.
+def obtener_tareas(token, user_id):
+
+    headers = _headers_tareas(token)
+
+    try:
+        respuesta = cliente_servicios.vuelo_unico.ejecutar(("TAREAS", token), lambda: _pedir_tareas(headers))
+
+    except TimeoutError as error:
+        print(f"Error al obtener tareas: {error}")
+        respuesta = None
+
+    # El microservicio no respondio: devolvemos la ultima lista de tareas que vimos de este usuario (si hay).
+    if respuesta is None:
+        copia = cache_tareas.obtener(user_id)
+        if copia is None:
+            return None
+
+        tareas, edad = copia
+        _marcar_obsoleta(edad)
+        programar_refresco(token, user_id, cache_tareas, _pedir_tareas, _tareas_de_respuesta)
+        return tareas
+
+    if respuesta.status_code != 200:
+        return None
+
+    # Tomamos la lista de tareas del diccionario que devolvio el microservicio de tareas.(Si la clave tareas no existe devolvemos una lista vacia)
+    tareas = _tareas_de_respuesta(respuesta.json())
+    cache_tareas.guardar(user_id, tareas)
+    return tareas
+
+
+# Pide al microservicio de Tareas las tareas pendientes vencidas y por vencer del usuario (lo resuelve con el indice de vencimientos,
+# sin enviar todas las tareas). Devuelve (vencimientos, respuesta):
+#   vencimientos: el diccionario {"vencidas", "por_vencer", "totales"}, o None si no se pudo obtener.
+#   respuesta: la respuesta del microservicio de Tareas, o None si no respondio (fallo, timeout o circuito abierto).
+def obtener_vencimientos(token, user_id):
+
+    headers = _headers_tareas(token)
+
+    try:
+        respuesta = cliente_servicios.vuelo_unico.ejecutar(("VENCIMIENTOS", token), lambda: _pedir_vencimientos(headers))
+
+    except TimeoutError as error:
+        print(f"Error al obtener vencimientos: {error}")
+        respuesta = None
+
+    # El microservicio no respondio: calculamos los vencimientos con la hora actual a partir de las ultimas tareas
+    # que vimos de este usuario (si hay), sin hacer otra peticion.
+    if respuesta is None:
+        return _vencimientos_de_respaldo(token, user_id), None
+
+    # Respondio con un error (por ejemplo 429): no hay vencimientos, pero tampoco se usa el cache.
+    if respuesta.status_code != 200:
+        return None, respuesta
+
+    vencimientos = respuesta.json()
+    # Guardamos la respuesta con las filas de las tareas. Si despues se usa el cache, se vuelve a dividir con la hora de ese momento.
+    cache_vencimientos.guardar(user_id, vencimientos)
+    return vencimientos, respuesta
+
+
+# Vencimientos a partir del cache de respaldo. Primero el de vencimientos y si no hay, la ultima lista completa de tareas.
+# Programa una actualizacion en segundo plano del cache usado. Devuelve None si no hay datos del usuario.
+def _vencimientos_de_respaldo(token, user_id):
+
+    copia = cache_vencimientos.obtener(user_id)
+    if copia is not None:
+        guardados, edad = copia
+        _marcar_obsoleta(edad)
+        programar_refresco(token, user_id, cache_vencimientos, _pedir_vencimientos)
+        return _actualizar_vencimientos(guardados)
+
+    copia = cache_tareas.obtener(user_id)
+    if copia is not None:
+        tareas, edad = copia
+        _marcar_obsoleta(edad)
+        programar_refresco(token, user_id, cache_tareas, _pedir_tareas, _tareas_de_respuesta)
+        return _vencimientos_desde_tareas(tareas)
+
+    return None
+
+
+# Calcula las vencidas y por vencer con la hora actual a partir de una lista de tareas (la del cache de respaldo cuando el microservicio de Tareas falla).
+# Devuelve el mismo formato que obtener_vencimientos.
+def _vencimientos_desde_tareas(tareas):
+
+    ahora = int(time.time())
+    fin_ventana = ahora + VENTANA_RECORDATORIO_HORAS * 3600
+
+    pendientes = [t for t in tareas if not t["completada"]]
+    con_vencimiento = sorted((t for t in pendientes if t.get("vencimiento") is not None), key=lambda t: t["vencimiento"])
+
+    vencidas = [t for t in con_vencimiento if t["vencimiento"] < ahora]
+    por_vencer = [t for t in con_vencimiento if ahora <= t["vencimiento"] < fin_ventana]
+
+    return {
+        "vencidas": vencidas[:TAREAS_EN_MENSAJE],
+        "por_vencer": por_vencer[:TAREAS_EN_MENSAJE],
+        "totales": {"pendientes": len(pendientes), "vencidas": len(vencidas), "por_vencer": len(por_vencer)},
+    }
+
+
+# Vuelve a dividir con la hora actual unos vencimientos guardados en el cache (las tareas por vencer pudieron vencer desde entonces).
+# El cache solo tiene las primeras tareas de cada grupo, asi que los totales se corrigen con las tareas guardadas que pasaron a vencidas.
+def _actualizar_vencimientos(guardados):
+
+    vencimientos = _vencimientos_desde_tareas(guardados["vencidas"] + guardados["por_vencer"])
+    nuevas_vencidas = vencimientos["totales"]["vencidas"] - len(guardados["vencidas"])
+
+    vencimientos["totales"] = {
+        "pendientes": guardados["totales"]["pendientes"],
+        "vencidas": guardados["totales"]["vencidas"] + nuevas_vencidas,
+        "por_vencer": guardados["totales"]["por_vencer"] - nuevas_vencidas,
+    }
+    return vencimientos
+
+
+# Nombra las tareas de una lista con su vencimiento. Si hay mas de las que se nombran, lo indica al final.
+def _nombrar_tareas(tareas, total):
+
+    nombres = [f"{t['tarea']} ({datetime.fromtimestamp(t['vencimiento'], tz=timezone.utc).strftime('%Y-%m-%d %H:%M UTC')})"
+            for t in tareas]
+
+    if total > len(tareas):
+        nombres.append(f"y {total - len(tareas)} mas")
+
+    return ", ".join(nombres)
+
+
+# Arma el mensaje del recordatorio: cuantas tareas pendientes hay, cuales vencieron y cuales vencen pronto.
+def armar_mensaje(vencimientos):
+
+    totales = vencimientos["totales"]
+
+    if not totales["pendientes"]:
+        return "No tenes tareas pendientes"
+
+    partes = [f"Tenes {totales['pendientes']} tareas pendientes"]
+
+    if totales["vencidas"]:
+        partes.append(f"{totales['vencidas']} vencidas: {_nombrar_tareas(vencimientos['vencidas'], totales['vencidas'])}")
+
+    if totales["por_vencer"]:
+        partes.append(f"{totales['por_vencer']} vencen en las proximas {VENTANA_RECORDATORIO_HORAS} horas: "
+                    f"{_nombrar_tareas(vencimientos['por_vencer'], totales['por_vencer'])}")
+
+    return ". ".join(partes)
+
+
+# Cuando el circuito de Tareas esta abierto, programa una actualizacion en segundo plano de un cache de respaldo del usuario
+# para el momento en que el circuito pase a HALF_OPEN. Solo hay una actualizacion pendiente por cache y usuario.
+#   pedir: funcion que recibe los headers y hace la peticion (_pedir_tareas, _pedir_vencimientos).
+#   convertir: funcion que recibe el JSON de la respuesta y devuelve lo que se guarda en el cache (None = el JSON completo).
+def programar_refresco(token, user_id, cache, pedir, convertir=None):
+
+    espera = cb_tarea.segundos_para_probar()
+    if espera is None:
+        return
+
+    pendiente = (cache.nombre, user_id)
+    with lock_refrescos:
+        if pendiente in refrescos_pendientes:
+            return
+        refrescos_pendientes.add(pendiente)
+
+    def refrescar():
+        try:
+            respuesta = pedir({"Authorization": f"Bearer {token}"})
+            if respuesta is not None and respuesta.status_code == 200:
+                datos = respuesta.json()
+                cache.guardar(user_id, convertir(datos) if convertir else datos)
+                print(f"Cache {cache.nombre} del usuario {user_id} actualizado en segundo plano")
+
+        finally:
+            with lock_refrescos:
+                refrescos_pendientes.discard(pendiente)
+
+    temporizador = threading.Timer(espera, refrescar)
+    temporizador.daemon = True # No impide que el microservicio se cierre.
+    temporizador.start()
+
+
+# Devuelve el user_id del token si es valido, o None. La usa el limitador para identificar al usuario.
+def usuario_del_token(token):
+    datos_autenticacion = validar_token(token)
+    return datos_autenticacion.get("user_id") if datos_autenticacion else None
+
+
+# Si la respuesta uso datos del cache de respaldo, avisamos al cliente cuantos segundos tienen esos datos.
+@rutas.after_request
+def avisar_datos_obsoletos(respuesta):
+    edad = g.get("edad_datos_obsoletos")
+    if edad is not None:
+        respuesta.headers["X-Datos-Obsoletos"] = str(int(edad))
+        respuesta.headers["Warning"] = '110 - "Response is Stale"'
+    return respuesta
+
+
+# ============
+# CREAR LA APP
+# ============
+
+# Arma la app Flask del microservicio: carga el .env, registra los middlewares y las rutas y prepara la base de datos.
+def crear_app():
+    arranque.fin_de_imports()
+    arranque.cargar_entorno()
+
+    with arranque.fase("app"):
+        app = Flask(__name__)
+        registrar_json(app) # jsonify serializa los registros de la base de datos sin convertirlos antes a diccionarios.
+
+        # Las trazas y las metricas se registran antes que el limitador para medir tambien las peticiones rechazadas (429).
+        trazas.registrar_trazas(app, "notificaciones")
+        registrar_metricas(app, "notificaciones")
+
+        # Cada recordatorio consulta a los otros dos microservicios, por eso se limita a 10 seguidos y luego 2 por segundo por usuario.
+        # Antes de validar el token se revisa un limite por IP mucho mas alto, asi una rafaga no llama a /validate.
+        registrar_limitador(app, {}, obtener_usuario=usuario_del_token, regla_por_defecto=Regla(capacidad=10, por_segundo=2),
+                            regla_previa_ip=Regla(capacidad=500, por_segundo=100))
+
+        app.register_blueprint(rutas)
+
+    # Crea la tabla solo si la base de datos no tiene la version actual del esquema.
+    with arranque.fase("base de datos"):
+        database.crear_tabla()
+
+    return app
 
 # ==========
 # ENDOPOINTS
 # ==========
 
 
-# Funcion que notifica al usuario cuantas tareas pendientes tiene, guarda a quien envio el recordatorio(id_user) y el mensaje que le envio en la base de datos.
-@app.route("/recordatorios", methods=['POST'])
+# Funcion que notifica al usuario cuantas tareas pendientes tiene (y cuales vencieron o vencen pronto), guarda a quien envio el recordatorio(id_user) y el mensaje que le envio en la base de datos.
+@rutas.route("/recordatorios", methods=['POST'])
 def generar_recordatorio():
 
     try:
@@ -59,49 +429,41 @@ def generar_recordatorio():
         # Limpiamos el token y obtenemos solo el valor del token
         token = header_autorizacion.replace("Bearer ", "")
 
-        # Pedimos permiso al circuit breaker para enviar peticiones al microservicio de Autenticacion.
-        respuesta = cb_autenticacion.ejecutar(lambda: requests.post(URL_SERVICE_AUTH, json={"token": token}))
+        # Pedimos permiso al circuit breaker para enviar peticiones al microservicio de Autenticacion.(Devuelve un diccionario con los datos del usuario)
+        datos_autenticacion = validar_token(token)
         
         # Verificamos si la llamada se pudo ejecutar y tuvo éxito
-        if not respuesta or respuesta.status_code != 200:
+        if not datos_autenticacion:
             return jsonify({"Error": "Servicio de tareas no disponible"}), 503 # Es un problema entre servicios
         
-        # Convertimos la respuesta que en un diccionario.
-        datos_autenticacion = respuesta.json()
         user_id = datos_autenticacion.get("user_id") # obtenemos el user_id del diccionario
 
         if not user_id:
             return jsonify({"error": "Usuario no válido"}), 401
 
-        # -----------------------------------
-        # OBTENEMOS LAS TAREAS DE ESE USUARIO
-        # -----------------------------------
+        # ------------------------------------------------------
+        # OBTENEMOS LAS TAREAS VENCIDAS Y POR VENCER DEL USUARIO
+        # ------------------------------------------------------
 
         # Pedimos permiso al circuit breaker para enviar peticiones al microservicio de Tareas.
-        tareas_respuesta = cb_tarea.ejecutar(lambda: requests.get(URL_SERVICE_TASK, headers={"Authorization": f"Bearer {token}"}))
-        
-        # Verificamos si la llamada se pudo ejecutar y tuvo éxito
-        if not tareas_respuesta or tareas_respuesta.status_code != 200:
-            return jsonify({"Error": "Servicio de tareas no disponible"}), 503
+        # Si no respondio, los vencimientos se calculan con el cache de respaldo (si hay datos del usuario).
+        vencimientos, respuesta_tareas = obtener_vencimientos(token, user_id)
 
-        # Convertimos la respuesta del microservicio de tareas en una lista de diccionarios.
-        datos = tareas_respuesta.json()  
-        tareas = datos.get("tareas", []) # Tomamos la lista de tareas del diccionario que devolvio el microservicio de tareas.(Si la clave tareas no existe devolvemos una lista vacia)
+        if vencimientos is None:
 
-        # Creamos una nueva lista de tareas pendientes.
-        pendientes = [t for t in tareas 
-                    if not t["completada"]]
+            # El microservicio de Tareas limito al usuario: le pasamos el limite al cliente, sin pedirle nada mas.
+            if respuesta_tareas is not None and respuesta_tareas.status_code == 429:
+                return jsonify({"Error": "Demasiadas peticiones, intente mas tarde"}), 429, {"Retry-After": respuesta_tareas.headers.get("Retry-After", "1")}
 
-        if not pendientes:
-            mensaje = "No tenes tareas pendientes"
+            return jsonify({"Error": "Servicio de tareas no disponible"}), 503
 
-        else:
-            mensaje = f"Tenes {len(pendientes)} tareas pendientes"
+        mensaje = armar_mensaje(vencimientos)
 
         # Guardamos el id_user de a quien enviamos el mensaje, y el mensaje.
-        database.guardar_recordatorio(user_id, mensaje)
+        with trazas.span("db guardar_recordatorio"):
+            database.guardar_recordatorio(user_id, mensaje)
 
-        return jsonify({"mensaje": mensaje}), 200
+        return jsonify({"mensaje": mensaje, "vencidas": vencimientos["vencidas"], "por_vencer": vencimientos["por_vencer"]}), 200
 
     except Exception as error:
         print(f"Error, no se pudo generar recordatorio: {error}")
@@ -109,7 +471,7 @@ def generar_recordatorio():
 
 
 # Funcion que devuelve al usuario las tareas que tiene pendiente.
-@app.route("/tasks/pendientes", methods=["GET"])
+@rutas.route("/tasks/pendientes", methods=["GET"])
 def tareas_pendientes():
     
     # Obtener token de autorization del header.
@@ -121,14 +483,12 @@ def tareas_pendientes():
     token = auth_header.replace("Bearer ", "")
 
     # Hacemos una peticion al microservicio de autenticacion para validar el token recibido.(ENDPOINT/VALIDATE "POST")
-    respuesta = cb_autenticacion.ejecutar(lambda: requests.post(URL_SERVICE_AUTH, json={"token": token}))
+    datos_autenticacion = validar_token(token)
     
     # Verificamos si la llamada se pudo ejecutar y tuvo éxito
-    if not respuesta or respuesta.status_code != 200:
+    if not datos_autenticacion:
         return jsonify({"Error": "Servicio de tareas no disponible"}), 503
 
-    # Convertimos la respuesta del microservicio de autenticacion en un diccionario.
-    datos_autenticacion = respuesta.json()
     user_id = datos_autenticacion.get("user_id") # Obtenemos el user_id
 
     if not user_id:
@@ -136,14 +496,12 @@ def tareas_pendientes():
 
     # Hacemos una peticion al Microservicio de Tareas para obtener las tareas del usuario.
     # Obtener tareas con Circuit Breaker
-    tareas_respuesta = cb_tarea.ejecutar(lambda: requests.get(URL_SERVICE_TASK, headers={"Authorization": f"Bearer {token}"}))
+    tareas = obtener_tareas(token, user_id)
     
     # Verificamos si la llamada se pudo ejecutar y tuvo éxito
-    if not tareas_respuesta or tareas_respuesta.status_code != 200:
+    if tareas is None:
         return jsonify({"Error": "Servicio de tareas no disponible"}), 503
 
-    # Convertimos la respuesta JSON a un diccionario, obtenemos solo la lista de tareas.
-    tareas = tareas_respuesta.json().get("tareas", [])
     pendientes = [t for t in tareas 
                 if not t["completada"]] # Filtramos solo las tareas pendientes para devolver al usuario.
 
@@ -152,13 +510,16 @@ def tareas_pendientes():
 
 if __name__ == "__main__":
 
+    app = crear_app()
+    arranque.medir_si_se_pidio("notificaciones") # Con --medir-arranque muestra los tiempos del arranque y termina.
+
     print("\n" + "="*60)
     print("Microservicio de Recordatorios - CON Circuit Breaker")
     print("="*60)
     print("IP: 127.0.0.1")
     print("Puerto: 5002")
     print("\nENDPOINTS DISPONIBLES:")
-    print("POST  /recordatorios  -> Notifica al usuario cuantas tareas pendientes tiene o si no tiene tareas pendientes")
+    print("POST  /recordatorios  -> Notifica al usuario cuantas tareas pendientes tiene, cuales vencieron y cuales vencen en las proximas 24 horas")
     print("GET /tasks/pendientes -> Devuelve al usuario las tareas que tiene pendiente\n")
     
     app.run(host="127.0.0.1", port=5002, debug=True)
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""
+Cache de respaldo (last-known-good).
+
+Guarda la ultima respuesta correcta que recibimos de otro microservicio (tareas de cada usuario, tokens validados).
+Si el microservicio falla o su Circuit Breaker esta abierto, devolvemos esa copia vieja en lugar de responder 503.
+Tiene un tamanho maximo: cuando se llena, se descarta lo que hace mas tiempo no se usa (LRU).
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+
+class CacheRespaldo:
+
+    def __init__(self, maximo=1000, nombre="Cache"):
+
+        self.maximo = maximo  # Cantidad maxima de claves guardadas.
+        self.nombre = nombre
+
+        self._datos = OrderedDict()        # clave -> (valor, momento_guardado, vence)  (el orden indica el uso mas reciente)
+        self._lock = threading.Lock()      # Protege el cache entre los hilos de Flask.
+
+
+    # Guarda una copia del valor. 'vence' es el momento (timestamp) a partir del cual el valor ya no se puede usar (None = nunca).
+    def guardar(self, clave, valor, vence=None):
+        with self._lock:
+            self._datos[clave] = (valor, time.time(), vence)
+            self._datos.move_to_end(clave)
+
+            # Si nos pasamos del maximo, eliminamos la clave que hace mas tiempo no se usa.
+            if len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+
+    # Devuelve (valor, edad_en_segundos) o None si no hay copia o ya vencio.
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+
+            valor, guardado, vence = entrada
+            ahora = time.time()
+
+            if vence is not None and vence <= ahora:
+                del self._datos[clave]
+                return None
+
+            self._datos.move_to_end(clave)
+            return valor, ahora - guardado
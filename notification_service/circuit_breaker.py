@@ -10,6 +10,9 @@ permitiendo que el servicio fallido se recupere sin colapsar todo el sistema
 from enum import Enum
 import time
 
+# Trazas distribuidas: cada ejecucion protegida se mide como un span (la app agrega la raiz del proyecto al path).
+from compartido import trazas
+
 """
 Estados posibles del Circuit Breaker:
 - CLOSED: Funcionamiento normal, todas las peticiones pasan
@@ -99,20 +102,29 @@ class CircuitBreaker:
             print(f"[{self.nombre}] Estado: OPEN - Servicio externo aún no recuperado")
 
 
+    # Devuelve cuantos segundos faltan para que el circuito deje pasar una peticion de prueba (HALF_OPEN), o None si no esta abierto.
+    def segundos_para_probar(self):
+        if self.estado != EstadoCircuito.OPEN:
+            return None
+        return max(0, self.tiempo_espera - (time.time() - self.momento_apertura))
+
+
     # Ejecuta una funcion protegida por Circuit Breaker. Devuelve el resultado de la función si tiene éxito, None si falla o si el circuito está bloqueado
     def ejecutar(self, funcion):
 
-        # Verificamos si podemos hacer una peticion.
-        if not self.permitir_peticion():
-            return None # bloqueado porque el circuito esta en estado OPEN.
-        
-        try:
-            # Ejecuta la función que le pasaste como argumento a tu Circuit Breaker. Guarda el valor que devuelva esa función en la variable resultado. 
-            resultado = funcion()  # Si la función falla (lanza un error), no se guarda nada y el flujo pasa al except.
-            self.registrar_exito()
-            return resultado # Devolvemos el resultado de la función para que el microservicio que hizo la llamada pueda seguir trabajando con los datos normalmente.
-        
-        # except, si hubo fallo, se registra fallo y controla el estado del breaker.
-        except Exception as error:
-            self.registrar_fallo(error)
-            return None # Devuelve None para que tu servicio sepa que la llamada falló, sin romper todo el flujo
\ No newline at end of file
+        with trazas.span(f"CircuitBreaker {self.nombre}", estado=self.estado.value):
+
+            # Verificamos si podemos hacer una peticion.
+            if not self.permitir_peticion():
+                return None # bloqueado porque el circuito esta en estado OPEN.
+            
+            try:
+                # Ejecuta la función que le pasaste como argumento a tu Circuit Breaker. Guarda el valor que devuelva esa función en la variable resultado. 
+                resultado = funcion()  # Si la función falla (lanza un error), no se guarda nada y el flujo pasa al except.
+                self.registrar_exito()
+                return resultado # Devolvemos el resultado de la función para que el microservicio que hizo la llamada pueda seguir trabajando con los datos normalmente.
+            
+            # except, si hubo fallo, se registra fallo y controla el estado del breaker.
+            except Exception as error:
+                self.registrar_fallo(error)
+                return None # Devuelve None para que tu servicio sepa que la llamada falló, sin romper todo el flujo
\ No newline at end of file
@@ -2,22 +2,46 @@
 """
 Base de datos del Microservicio de Recordatorios.
 Tiene funciones para crear la base de datos y la tabla, guardar recordatorios, obtener recordatorios
+Tiene la funcion de retencion que mueve los recordatorios viejos a una base de datos de archivo.
 """
 
 
 import sqlite3
+import time
 
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from compartido import vacuum
+from compartido.filas import definir_registro
 
 # Nombre de la base de datos.
 DB = "notificacion.db"
 
-# Funcion para crear base de datos y la tabla 'Recordatorios'
+# Base de datos donde se mueven los recordatorios viejos.
+DB_ARCHIVO = "notificacion_archivo.db"
+
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+
+# Registro de un recordatorio tal como se devuelve al cliente.
+Recordatorio = definir_registro("Recordatorio", ("id", "user_id", "mensaje", "fecha_evento"))
+
+# Version del esquema, se guarda en 'PRAGMA user_version'. Si la base de datos ya la tiene, no se vuelve a crear la tabla.
+# Hay que subirla cada vez que se cambia el esquema en crear_tabla.
+VERSION_ESQUEMA = 1
+
+# Funcion para crear base de datos y la tabla 'Recordatorios'. La llama crear_app() una vez al arrancar el microservicio.
 def crear_tabla():
 
     conexion = sqlite3.connect(DB)
     cursor = conexion.cursor()
 
+    if cursor.execute("PRAGMA user_version").fetchone()[0] >= VERSION_ESQUEMA:
+        conexion.close()
+        return
+
+    # Permite liberar de a poco las paginas que quedan vacias al archivar recordatorios (solo tiene efecto en bases de datos nuevas).
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS Recordatorios (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -26,6 +50,7 @@ def crear_tabla():
         fecha_evento TEXT NOT NULL)
     """)
 
+    cursor.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
     conexion.commit()
     conexion.close()
 
@@ -36,7 +61,7 @@ def guardar_recordatorio(user_id, mensaje):
     cursor = conexion.cursor()
 
     # Obtenemos el momento en que vamos a guardar el recordatorio en la base de datos.
-    fecha_actual = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    fecha_actual = datetime.now().strftime(FORMATO_FECHA)
 
     cursor.execute("""
     INSERT INTO Recordatorios (user_id, mensaje, fecha_evento) VALUES (?,?,?)    
@@ -49,18 +74,91 @@ def guardar_recordatorio(user_id, mensaje):
 def obtener_recordatorios(user_id):
 
     conexion = sqlite3.connect(DB)
-    conexion.row_factory = sqlite3.Row # Permite que cada fila que obtengamos se pueda acceder por el nombre de la columna, no solo por el indice.
+    conexion.row_factory = Recordatorio.desde_fila # Cada fila se convierte directamente en un registro Recordatorio.
     cursor = conexion.cursor()
 
-    cursor.execute("""
-    SELECT * FROM Recordatorios WHERE user_id = ?
+    # Pedimos solo las columnas del registro, en el mismo orden.
+    cursor.execute(f"""
+    SELECT {Recordatorio.sql()} FROM Recordatorios WHERE user_id = ?
     """, (user_id,))
 
-    # "fetchall()" devuelve todas las filas que cumplen la condición como una lista de objetos. (sqlite3.Row)
-    # Cada fila representa un recordatorio del usuario, accesible por nombre de columna gracias a "sqlite3.Row".
-    filas = cursor.fetchall()
+    # Devolvemos una lista de registros Recordatorio. (Se pueden enviar como JSON directamente)
+    recordatorios = cursor.fetchall()
     conexion.close()
 
-    # Devolvemos una lista de diccionarios. (Cada fila en un diccionario)(Ahora se puede enviar facilmente al usuario como JSON)
-    return [dict(fila) for fila in filas]
+    return recordatorios
+
+
+
+# =========
+# RETENCION
+# =========
+
+# Mueve los recordatorios de hace mas de 'dias' dias a la base de datos de archivo, en lotes pequenhos con transacciones cortas.
+# Con simular=True solo cuenta cuantos recordatorios se moverian. Devuelve un diccionario con las estadisticas.
+def archivar_recordatorios(dias, lote=500, simular=False, pausa=0.05):
+
+    fecha_limite = (datetime.now() - timedelta(days=dias)).strftime(FORMATO_FECHA)
+    estadisticas = {"base_de_datos": DB, "fecha_limite": fecha_limite, "candidatos": 0, "archivados": 0, "lotes": 0}
+
+    # isolation_level=None: nosotros manejamos las transacciones (BEGIN / COMMIT) de cada lote.
+    conexion = sqlite3.connect(DB, timeout=5, isolation_level=None)
+    cursor = conexion.cursor()
+
+    try:
+        cursor.execute("SELECT COUNT(*) FROM Recordatorios WHERE fecha_evento < ?", (fecha_limite,))
+        estadisticas["candidatos"] = cursor.fetchone()[0]
+
+        if simular or estadisticas["candidatos"] == 0:
+            return estadisticas
+
+        cursor.execute("ATTACH DATABASE ? AS archivo", (DB_ARCHIVO,))
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS archivo.RecordatoriosArchivo (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            mensaje TEXT NOT NULL,
+            fecha_evento TEXT NOT NULL,
+            fecha_archivado TEXT NOT NULL)
+        """)
+
+        # Los recordatorios se guardan en orden, los mas viejos tienen los id mas chicos: recorremos por id.
+        ultimo_id = 0
+
+        while True:
+            cursor.execute("BEGIN IMMEDIATE")
+
+            cursor.execute("SELECT id FROM Recordatorios WHERE id > ? AND fecha_evento < ? ORDER BY id LIMIT ?", (ultimo_id, fecha_limite, lote))
+            ids = [fila[0] for fila in cursor.fetchall()]
+
+            if not ids:
+                cursor.execute("COMMIT")
+                break
+
+            marcadores = ",".join("?" * len(ids))
+            cursor.execute(f"""
+            INSERT OR REPLACE INTO archivo.RecordatoriosArchivo (id, user_id, mensaje, fecha_evento, fecha_archivado)
+            SELECT id, user_id, mensaje, fecha_evento, ? FROM Recordatorios WHERE id IN ({marcadores})
+            """, (datetime.now().strftime(FORMATO_FECHA), *ids))
+
+            cursor.execute(f"DELETE FROM Recordatorios WHERE id IN ({marcadores})", ids)
+            cursor.execute("COMMIT")
+
+            estadisticas["archivados"] += len(ids)
+            estadisticas["lotes"] += 1
+            ultimo_id = ids[-1]
+
+            time.sleep(pausa) # Dejamos pasar a las escrituras del microservicio entre lote y lote.
+
+        cursor.execute("DETACH DATABASE archivo")
+
+        estadisticas.update(vacuum.vacuum_incremental(conexion))
+        return estadisticas
+
+    finally:
+        conexion.close()
+
 
+# Activa auto_vacuum INCREMENTAL en una base de datos creada antes de la retencion. Reescribe todo el archivo (VACUUM), usar fuera de horario.
+def activar_vacuum_incremental():
+    vacuum.activar_vacuum_incremental(DB)
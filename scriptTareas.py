@@ -18,6 +18,14 @@ print("\n=== TASK | CREAR TAREA ===")
 r = requests.post(f"{TASK_URL}/tasks", json={"tarea": "Aprender microservicios"}, headers=headers)
 print(r.status_code, r.json())
 
+print("\n=== TASK | CREAR TAREA CON VENCIMIENTO ===")
+r = requests.post(f"{TASK_URL}/tasks", json={"tarea": "Entregar el trabajo practico", "fecha_vencimiento": "2030-06-30T18:00:00"}, headers=headers)
+print(r.status_code, r.json())
+
+print("\n=== TASK | VENCIDAS Y POR VENCER (PROXIMAS 24 HORAS) ===")
+r = requests.get(f"{TASK_URL}/tasks/vencimientos", params={"ventana_horas": 24}, headers=headers)
+print(r.status_code, r.json())
+
 print("\n=== TASK | LISTAR TAREAS ===")
 r = requests.get(f"{TASK_URL}/task", headers=headers)
 print(r.status_code, r.json())
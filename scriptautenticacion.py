@@ -16,7 +16,16 @@ r = requests.post(f"{BASE_URL}/login", json=usuario)
 print(r.status_code, r.json())
 
 token = r.json().get("token")
+refresh_token = r.json().get("refresh_token")
 
 print("\n=== AUTH | VALIDATE TOKEN ===")
 r = requests.post(f"{BASE_URL}/validate", json={"token": token})
 print(r.status_code, r.json())
+
+print("\n=== AUTH | REFRESH TOKEN ===")
+r = requests.post(f"{BASE_URL}/refresh", json={"refresh_token": refresh_token})
+print(r.status_code, r.json())
+
+print("\n=== AUTH | REFRESH TOKEN REUTILIZADO (revoca la sesion) ===")
+r = requests.post(f"{BASE_URL}/refresh", json={"refresh_token": refresh_token})
+print(r.status_code, r.json())
@@ -0,0 +1,97 @@
+
+"""
+Comandos de administracion de la base de datos del microservicio de Tareas.
+Uso (desde la carpeta task_service):
+    python admin.py reconstruir-busqueda   -> Vuelve a construir el indice de busqueda de texto completo.
+    python admin.py retencion --dias 90 [--lote 500] [--simular]   -> Mueve las tareas completadas viejas al archivo.
+    python admin.py activar-vacuum   -> Activa auto_vacuum INCREMENTAL en una base de datos existente (reescribe el archivo).
+    python admin.py estadisticas   -> Cuenta las tareas de todos los shards.
+    python admin.py reshardear --shards 4   -> Copia las tareas a 4 shards nuevos (con el microservicio detenido).
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Agregamos la carpeta raiz del proyecto al path para poder importar los modulos compartidos entre microservicios.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compartido import arranque
+
+# Cargamos el .env antes de importar la base de datos, igual que crear_app() (por ejemplo TAREAS_NUM_SHARDS).
+arranque.cargar_entorno()
+
+import database
+
+
+# Comando que reconstruye el indice de busqueda (FTS5) a partir de la tabla Tareas.
+def comando_reconstruir_busqueda(argumentos):
+    database.iniciar_bd()
+    total = database.reconstruir_indice_busqueda()
+    print(f"Indice de busqueda reconstruido: {total} tareas indexadas")
+
+
+# Comando que archiva las tareas completadas hace mas de N dias y muestra las estadisticas.
+def comando_retencion(argumentos):
+    database.iniciar_bd()
+    estadisticas = database.archivar_tareas_completadas(argumentos.dias, lote=argumentos.lote, simular=argumentos.simular)
+
+    if argumentos.simular:
+        print("Simulacion: no se movio ninguna tarea")
+    print(json.dumps(estadisticas, indent=2))
+
+
+# Comando que activa el vacuum incremental en una base de datos creada antes de la retencion.
+def comando_activar_vacuum(argumentos):
+    database.iniciar_bd()
+    database.activar_vacuum_incremental()
+    print("auto_vacuum INCREMENTAL activado")
+
+
+# Comando que muestra las estadisticas de todos los shards.
+def comando_estadisticas(argumentos):
+    database.iniciar_bd()
+    print(json.dumps(database.estadisticas_globales(), indent=2))
+
+
+# Comando que migra las tareas a una nueva cantidad de shards.
+def comando_reshardear(argumentos):
+    try:
+        estadisticas = database.reshardear(argumentos.shards, lote=argumentos.lote)
+    except ValueError as error:
+        sys.exit(f"Error: {error}")
+
+    print(json.dumps(estadisticas, indent=2))
+
+    # Las tareas con id reasignado cambian de id para los clientes (por ejemplo en PUT /tasks/<id>/complete).
+    if estadisticas["ids_reasignados"]:
+        print(f"Atencion: {estadisticas['ids_reasignados']} tareas recibieron un id nuevo porque su id ya existia en el shard nuevo. "
+              "Los clientes ven esas tareas con el id nuevo")
+    print(f"Migracion terminada. Iniciar el microservicio con TAREAS_NUM_SHARDS={argumentos.shards}")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Administracion de la base de datos de tareas")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    subcomandos.add_parser("reconstruir-busqueda", help="Reconstruye el indice de busqueda de texto completo").set_defaults(funcion=comando_reconstruir_busqueda)
+
+    retencion = subcomandos.add_parser("retencion", help="Mueve las tareas completadas viejas a la base de datos de archivo")
+    retencion.add_argument("--dias", type=int, required=True, help="Archiva las tareas completadas hace mas de estos dias")
+    retencion.add_argument("--lote", type=int, default=500, help="Cantidad de tareas por transaccion")
+    retencion.add_argument("--simular", action="store_true", help="Solo muestra cuantas tareas se moverian")
+    retencion.set_defaults(funcion=comando_retencion)
+
+    subcomandos.add_parser("activar-vacuum", help="Activa auto_vacuum INCREMENTAL (reescribe todo el archivo)").set_defaults(funcion=comando_activar_vacuum)
+
+    subcomandos.add_parser("estadisticas", help="Cuenta las tareas de todos los shards").set_defaults(funcion=comando_estadisticas)
+
+    reshardear = subcomandos.add_parser("reshardear", help="Migra las tareas a una nueva cantidad de shards")
+    reshardear.add_argument("--shards", type=int, required=True, help="Cantidad de shards nueva")
+    reshardear.add_argument("--lote", type=int, default=1000, help="Cantidad de tareas que se leen por vez")
+    reshardear.set_defaults(funcion=comando_reshardear)
+
+    argumentos = parser.parse_args()
+    argumentos.funcion(argumentos)
@@ -1,8 +1,33 @@
 
-from flask import Flask, request, jsonify
+import os
+import sys
 
-# Importamos el modulo requests para poder hacer peticiones a los demas microservicios
-import requests
+# Agregamos la carpeta raiz del proyecto al path para poder importar los modulos compartidos entre microservicios.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Arranque del microservicio (crear_app). Se importa antes que Flask para medir tambien el tiempo de los imports.
+from compartido import arranque
+
+from flask import Flask, Blueprint, request, jsonify, g
+
+from datetime import datetime, timezone
+import time
+
+# Importamos el cliente para hacer peticiones a los demas microservicios (agrupa las peticiones identicas en curso).
+from compartido import cliente_servicios
+
+# Limitador de peticiones compartido por los tres microservicios.
+from compartido.limitador import Regla, registrar_limitador
+
+# Identidad firmada que envia el API Gateway y metricas del servicio.
+from compartido.identidad import identidad_de_la_peticion
+from compartido.metricas import registrar_metricas
+
+# Trazas distribuidas (miden el tiempo de la validacion del token y de cada consulta a la base de datos).
+from compartido import trazas
+
+# Serializacion a JSON de los registros que devuelve la base de datos.
+from compartido.filas import registrar_json
 
 import database
 
@@ -10,10 +35,8 @@ import database
 # SERVIDOR FLASK
 # ==============
 
-app = Flask(__name__)
-
-# Inicializamos la base de datos.
-database.iniciar_bd()
+# Rutas del microservicio. Es un Blueprint que se agrega a la app Flask en crear_app().
+rutas = Blueprint("tareas", __name__)
 
 # Definimos la URL con el ENDPOINT donde queremos hacer una peticion.
 URL_SERVICIO_AUT = "http://127.0.0.1:5000/validate"
@@ -24,12 +47,29 @@ URL_SERVICIO_AUT = "http://127.0.0.1:5000/validate"
 
 # Funcion que valida el token del usuario.
 def validar_token(token):
+
+    # Si la peticion viene del API Gateway, el token ya fue verificado y confiamos en la identidad firmada (no llamamos a /validate).
+    identidad = identidad_de_la_peticion()
+    if identidad and identidad.get("user_id"):
+        return {"valid": True, "user_id": identidad["user_id"], "username": identidad.get("username")}
+
+    # Si el token ya se valido en esta misma peticion (por ejemplo en el limitador), reutilizamos el resultado.
+    validados = g.setdefault("tokens_validados", {})
+    if token not in validados:
+        validados[token] = _validar_token_remoto(token)
+
+    return validados[token]
+
+
+# Pide al microservicio de autenticacion que valide el token.
+def _validar_token_remoto(token):
     try:
         headers = {"Content-Type": "application/json"}
         datos = {"token": token}
 
         # Hacemos una peticion al microservicio de autenticacion para validar el token que recibimos
-        respuesta = requests.post(URL_SERVICIO_AUT, json=datos, headers=headers) 
+        # Si llegan varias peticiones con el mismo token al mismo tiempo, se hace una sola peticion a /validate.
+        respuesta = cliente_servicios.peticion_post(URL_SERVICIO_AUT, datos=datos, headers=headers)
 
         if respuesta.status_code != 200:
             return None # Devolvemos none(token invalido o expirado)
@@ -39,12 +79,93 @@ def validar_token(token):
     except Exception as error:
         print(f"Error al validar token: {error}")
 
+# Ultimo vencimiento aceptado (9999-12-31 23:59:59 UTC).
+VENCIMIENTO_MAXIMO = 253402300799
+
+
+# Convierte el vencimiento que envio el usuario en un timestamp UTC (segundos). Acepta un numero (timestamp)
+# o una fecha en formato ISO ("2025-06-30T18:00:00", "2025-06-30 18:00:00-03:00"). Sin zona horaria se toma como UTC.
+# Devuelve None si no se envio vencimiento y lanza ValueError si el valor no es valido.
+def leer_vencimiento(valor):
+
+    if valor is None or valor == "":
+        return None
+
+    if isinstance(valor, bool): # bool es un int en python, pero no es un vencimiento valido.
+        raise ValueError("fecha_vencimiento invalida")
+
+    if isinstance(valor, (int, float)):
+        vencimiento = int(valor)
+
+    elif isinstance(valor, str):
+        fecha = datetime.fromisoformat(valor.strip())
+        if fecha.tzinfo is None:
+            fecha = fecha.replace(tzinfo=timezone.utc)
+        vencimiento = int(fecha.timestamp())
+
+    else:
+        raise ValueError("fecha_vencimiento invalida")
+
+    # Solo aceptamos fechas entre 1970 y el anho 9999 (los numeros enormes darian error al guardarlos en sqlite).
+    if not 0 <= vencimiento <= VENCIMIENTO_MAXIMO:
+        raise ValueError("fecha_vencimiento fuera de rango")
+
+    return vencimiento
+
+
+# Devuelve el user_id del token si es valido, o None. La usa el limitador para identificar al usuario.
+def usuario_del_token(token):
+    resultado = validar_token(token)
+    return resultado.get("user_id") if resultado and resultado.get("valid") else None
+
+
+# =======================
+# LIMITADOR DE PETICIONES
+# =======================
+
+# Todos los endpoints se limitan por usuario: 30 peticiones seguidas y luego 10 por segundo.
+# Listar tareas lee todas las tareas del usuario, por eso tiene un limite mas bajo.
+LIMITES = {
+    "listar_tareas": Regla(capacidad=10, por_segundo=2),
+}
+
+
+# ============
+# CREAR LA APP
+# ============
+
+# Arma la app Flask del microservicio: carga el .env, registra los middlewares y las rutas y prepara la base de datos.
+def crear_app():
+    arranque.fin_de_imports()
+    arranque.cargar_entorno()
+
+    with arranque.fase("app"):
+        app = Flask(__name__)
+        registrar_json(app) # jsonify serializa los registros de la base de datos sin convertirlos antes a diccionarios.
+
+        # Las trazas y las metricas se registran antes que el limitador para medir tambien las peticiones rechazadas (429).
+        trazas.registrar_trazas(app, "tareas")
+        registrar_metricas(app, "tareas")
+        # Antes de validar el token se revisa un limite por IP mucho mas alto, asi una rafaga no llama a /validate.
+        # Es alto porque el microservicio de Recordatorios llama desde 127.0.0.1 en nombre de todos los usuarios.
+        registrar_limitador(app, LIMITES, obtener_usuario=usuario_del_token, regla_por_defecto=Regla(capacidad=30, por_segundo=10),
+                            regla_previa_ip=Regla(capacidad=1000, por_segundo=300))
+
+        app.register_blueprint(rutas)
+
+    # Crea las tablas solo en los shards que no tienen la version actual del esquema.
+    with arranque.fase("base de datos"):
+        database.iniciar_bd()
+
+    return app
+
+
 # ======================
 # ENDPOINTS DEL SERVIDOR
 # ======================
 
 # Funcion para recibir y crear tareas.
-@app.route("/tasks", methods=['POST'])
+@rutas.route("/tasks", methods=['POST'])
 def crear_tarea():
     try:
         # Obtenemos de la peticion el header de autorizacion y lo guardamos.
@@ -70,9 +191,16 @@ def crear_tarea():
 
         if not tarea:
             return jsonify({"Error": "Tarea requerido"}), 400
+
+        # El vencimiento es opcional. Se guarda como timestamp UTC para poder ordenar y buscar por rangos.
+        try:
+            vencimiento = leer_vencimiento(datos.get("fecha_vencimiento"))
+        except (ValueError, OverflowError):
+            return jsonify({"Error": "fecha_vencimiento invalida (timestamp o fecha ISO, por ejemplo 2025-06-30T18:00:00)"}), 400
         
-        # Agregamos a la base de datos el user_id y la tarea.
-        database.agregar_tarea(user_id, tarea)
+        # Agregamos a la base de datos el user_id, la tarea y su vencimiento.
+        with trazas.span("db agregar_tarea"):
+            database.agregar_tarea(user_id, tarea, vencimiento)
 
         return jsonify({"message": "Tarea creada correctamente"})
     
@@ -82,7 +210,7 @@ def crear_tarea():
 
 
 # Funcion para recibir filtros y enviar las tareas solicitadas.
-@app.route("/task", methods=["GET"])
+@rutas.route("/task", methods=["GET"])
 def listar_tareas():
 
     # Obtenemos el token del header que envio el usuario y lo guardamos.
@@ -100,13 +228,76 @@ def listar_tareas():
     
     # Obtenemos el user_id y filtramos todas las tareas del usuario por su user_id.
     user_id = resultado.get("user_id")
-    tareas = database.obtener_tareas(user_id)
+    with trazas.span("db obtener_tareas"):
+        tareas = database.obtener_tareas(user_id)
 
     return jsonify({"user_id": user_id, "tareas": tareas}), 200
 
 
+# Funcion que busca tareas del usuario por su texto. Parametros: q (texto a buscar, 'palabra*' busca por prefijo), pagina y por_pagina.
+@rutas.route("/tasks/search", methods=["GET"])
+def buscar_tareas():
+
+    # Obtenemos el token del header que envio el usuario y lo guardamos.
+    header_autorizacion = request.headers.get("Authorization")
+
+    if not header_autorizacion:
+        return jsonify({"Error": "Token requerido"}), 401
+    
+    token = header_autorizacion.replace("Bearer ", "")
+    resultado = validar_token(token)
+
+    if not resultado.get("valid"):
+        return jsonify({"Error": "Token invalido"}), 401
+
+    texto = request.args.get("q", "").strip()
+
+    if not texto:
+        return jsonify({"Error": "Parametro q requerido"}), 400
+
+    # Paginacion: por_pagina entre 1 y 100.
+    pagina = max(request.args.get("pagina", 1, type=int), 1)
+    por_pagina = min(max(request.args.get("por_pagina", 20, type=int), 1), 100)
+
+    user_id = resultado.get("user_id")
+
+    with trazas.span("db buscar_tareas"):
+        tareas = database.buscar_tareas(user_id, texto, limite=por_pagina, desplazamiento=(pagina - 1) * por_pagina)
+
+    return jsonify({"user_id": user_id, "pagina": pagina, "por_pagina": por_pagina, "tareas": tareas}), 200
+
+
+# Funcion que devuelve las tareas pendientes vencidas y las que vencen en las proximas 'ventana_horas' horas (por defecto 24).
+# Parametros: ventana_horas (1 a 720) y limite (maximo de tareas de cada lista, 1 a 500). La usa el microservicio de Recordatorios.
+@rutas.route("/tasks/vencimientos", methods=["GET"])
+def listar_vencimientos():
+
+    # Obtenemos el token del header que envio el usuario y lo guardamos.
+    header_autorizacion = request.headers.get("Authorization")
+
+    if not header_autorizacion:
+        return jsonify({"Error": "Token requerido"}), 401
+
+    token = header_autorizacion.replace("Bearer ", "")
+    resultado = validar_token(token)
+
+    if not resultado.get("valid"):
+        return jsonify({"Error": "Token invalido"}), 401
+
+    ventana_horas = min(max(request.args.get("ventana_horas", 24, type=int), 1), 720)
+    limite = min(max(request.args.get("limite", 50, type=int), 1), 500)
+
+    user_id = resultado.get("user_id")
+    ahora = int(time.time())
+
+    with trazas.span("db obtener_vencimientos"):
+        vencimientos = database.obtener_vencimientos(user_id, ahora, ventana_horas * 3600, limite=limite)
+
+    return jsonify({"user_id": user_id, "ahora": ahora, "ventana_horas": ventana_horas, **vencimientos}), 200
+
+
 # Funcion para actualizar una tarea como completada.
-@app.route("/tasks/<int:task_id>/complete", methods=["PUT"]) # "<int:task_id>" variable dinamica, tendra el valor que le asigne el usuario en su peticion.
+@rutas.route("/tasks/<int:task_id>/complete", methods=["PUT"]) # "<int:task_id>" variable dinamica, tendra el valor que le asigne el usuario en su peticion.
 def completar_tarea(task_id):
 
     # Obtenemos el token del header que envio el usuario.
@@ -126,7 +317,8 @@ def completar_tarea(task_id):
     user_id = resultado.get("user_id")
 
     # Usamos la funcion de marcar la tarea como completada de la base de datos.
-    exito = database.marcar_completada(user_id, task_id)
+    with trazas.span("db marcar_completada"):
+        exito = database.marcar_completada(user_id, task_id)
 
     if not exito:
         return jsonify({"Error": "Tarea no encontrada o no pertenece al usuario"}), 404
@@ -135,7 +327,7 @@ def completar_tarea(task_id):
 
 
 # Funcion para eliminar tareas. (<int:task_id>) variable dinamica donde el usuario pondra el numero de fila exacto de la tarea que quiere borrar.
-@app.route("/tasks/<int:task_id>", methods=["DELETE"])
+@rutas.route("/tasks/<int:task_id>", methods=["DELETE"])
 def eliminar_tarea(task_id):
 
     # Obtenemos el token del header que envio el usuario.
@@ -152,7 +344,8 @@ def eliminar_tarea(task_id):
         return jsonify({"Error": "Token Requerido"}), 401 
     
     user_id = resultado.get("user_id")
-    exito = database.eliminar_tarea(user_id, task_id)
+    with trazas.span("db eliminar_tarea"):
+        exito = database.eliminar_tarea(user_id, task_id)
 
     # Verificamos si se pudo eliminar la tarea.
     if not exito:
@@ -163,6 +356,9 @@ def eliminar_tarea(task_id):
     
 if __name__ == "__main__":
 
+    app = crear_app()
+    arranque.medir_si_se_pidio("tareas") # Con --medir-arranque muestra los tiempos del arranque y termina.
+
     print("\n" + "="*60)
     print("Microservicio de Tareas")
     print("="*60)
@@ -171,6 +367,8 @@ if __name__ == "__main__":
     print("\nENDPOINTS DISPONIBLES:")
     print("POST  /tasks  -> Crea y agrega tareas")
     print("GET /tasks -> Recibe filtros y devuelve las tareas solicitadas")
+    print("GET /tasks/search?q=texto -> Busca tareas por su texto (pagina, por_pagina)")
+    print("GET /tasks/vencimientos?ventana_horas=24 -> Tareas pendientes vencidas y por vencer")
     print("PUT /tasks/<int:task_id>/complete -> Actualiza una tarea como completada")
     print("DELETE /tasks/<int:task_id> -> Elimina tareas\n")
 
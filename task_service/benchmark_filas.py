@@ -0,0 +1,114 @@
+
+"""
+Micro-benchmark de la lectura de tareas desde sqlite.
+Compara la forma anterior (sqlite3.Row -> dict -> segundo recorrido para convertir 'completada')
+con los registros Tarea (__slots__, una sola pasada) en tiempo y memoria, incluyendo la serializacion a JSON.
+
+Uso (desde la carpeta task_service):
+    python benchmark_filas.py [--filas 100000] [--repeticiones 5]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Agregamos la carpeta raiz del proyecto al path para poder importar los modulos compartidos entre microservicios.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compartido.filas import volcar
+from database import Tarea
+
+
+# Crea una base de datos temporal con 'filas' tareas de un mismo usuario.
+def crear_datos(archivo, filas):
+    with sqlite3.connect(archivo) as conexion:
+        conexion.execute("""
+        CREATE TABLE Tareas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            tarea TEXT NOT NULL,
+            fecha_creacion TEXT NOT NULL,
+            fecha_vencimiento TEXT,
+            completada INTEGER DEFAULT 0,
+            vencimiento INTEGER
+        )""")
+        conexion.executemany(
+            "INSERT INTO Tareas (user_id, tarea, fecha_creacion, completada) VALUES (1, ?, '2024-01-01 10:00:00', ?)",
+            ((f"Tarea numero {i}", i % 2) for i in range(filas)),
+        )
+
+
+# Forma anterior: sqlite3.Row, conversion a diccionario y un segundo recorrido para 'completada'.
+def leer_con_diccionarios(archivo):
+    with sqlite3.connect(archivo) as conexion:
+        conexion.row_factory = sqlite3.Row
+        filas = conexion.execute("SELECT id, tarea, completada, fecha_creacion, vencimiento FROM Tareas WHERE user_id = ?", (1,)).fetchall()
+
+        tareas = [dict(fila) for fila in filas]
+        for tarea in tareas:
+            tarea["completada"] = bool(tarea["completada"])
+
+        return tareas
+
+
+# Forma nueva: cada fila se convierte en un registro Tarea mientras se lee.
+def leer_con_registros(archivo):
+    with sqlite3.connect(archivo) as conexion:
+        conexion.row_factory = Tarea.desde_fila
+        return conexion.execute(f"SELECT {Tarea.sql()} FROM Tareas WHERE user_id = ?", (1,)).fetchall()
+
+
+# Mide el mejor tiempo de lectura, el de serializacion y el pico de memoria de una funcion de lectura.
+def medir(funcion, serializar, archivo, repeticiones):
+
+    mejor_lectura = mejor_json = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        tareas = funcion(archivo)
+        mejor_lectura = min(mejor_lectura, time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        serializar(tareas)
+        mejor_json = min(mejor_json, time.perf_counter() - inicio)
+        del tareas
+
+    # La memoria se mide aparte, porque tracemalloc hace mas lento el codigo que mide.
+    tracemalloc.start()
+    tareas = funcion(archivo)
+    retenida, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "lectura_ms": round(mejor_lectura * 1000, 1),
+        "json_ms": round(mejor_json * 1000, 1),
+        "memoria_retenida_mb": round(retenida / 1024 / 1024, 2),
+        "memoria_pico_mb": round(pico / 1024 / 1024, 2),
+        "filas": len(tareas),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara la lectura de tareas con diccionarios y con registros __slots__")
+    parser.add_argument("--filas", type=int, default=100000, help="Cantidad de tareas de la base de datos de prueba")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Se informa el mejor tiempo de estas repeticiones")
+    argumentos = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        archivo = os.path.join(carpeta, "benchmark.db")
+        crear_datos(archivo, argumentos.filas)
+
+        resultados = {
+            "diccionarios": medir(leer_con_diccionarios, json.dumps, archivo, argumentos.repeticiones),
+            "registros": medir(leer_con_registros, volcar, archivo, argumentos.repeticiones),
+        }
+
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,17 +2,95 @@
 """
 Creamos la base de datos sqlite del microservicio de tareas.
 Tiene funciones de crear tabla, agregar tareas, obtener tareas, marcar tareas como completadas y la funcion de eliminar tareas.
+Tiene un indice de busqueda de texto completo (FTS5) sobre el texto de las tareas, que se mantiene sincronizado con triggers.
+Tiene la funcion de retencion que mueve las tareas completadas viejas a una base de datos de archivo.
+Tiene la consulta de tareas vencidas y por vencer de un usuario, que usa el indice (user_id, completada, vencimiento).
+
+Las tareas se reparten en varios archivos sqlite (shards) segun el user_id, asi cada archivo tiene su propio bloqueo de escritura.
+Todas las tareas de un usuario estan en el mismo shard. Con TAREAS_NUM_SHARDS=1 (por defecto) se usa solo 'tasks.db'.
 """
 
+import os
 import sqlite3
-from datetime import datetime
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from compartido import vacuum
+from compartido.filas import definir_registro
 
 DB = "tasks.db"
 
-# Funcion que crea la base de datos.
+# Cantidad de archivos (shards) en los que se reparten las tareas. Para cambiarlo hay que migrar con 'python admin.py reshardear'.
+NUM_SHARDS = int(os.getenv("TAREAS_NUM_SHARDS", "1"))
+
+# Base de datos donde se mueven las tareas completadas viejas (no se consultan en el dia a dia).
+DB_ARCHIVO = "tasks_archivo.db"
+
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+
+# Version del esquema (tablas, indice de busqueda, triggers y columnas agregadas despues). Se guarda en 'PRAGMA user_version'
+# de cada archivo, asi al arrancar solo se crean o migran las tablas de los archivos que tienen una version anterior.
+# Hay que subirla cada vez que se cambia el esquema en _iniciar_archivo.
+VERSION_ESQUEMA = 2
+
+# Registro de una tarea tal como se devuelve al cliente. 'completada' se convierte a booleano al leer la fila
+# (para no tener que adivinar que significa 0 o 1). 'vencimiento' es el momento de vencimiento (timestamp UTC en segundos) o None.
+Tarea = definir_registro("Tarea", ("id", "tarea", "completada", "fecha_creacion", "vencimiento"), conversiones={"completada": bool})
+
+# ======
+# SHARDS
+# ======
+
+# Devuelve el nombre del archivo de un shard. Con un solo shard es 'tasks.db', con varios 'tasks_0de4.db', 'tasks_1de4.db', ...
+def archivo_shard(indice, num_shards=None):
+    num_shards = num_shards or NUM_SHARDS
+
+    if num_shards == 1:
+        return DB
+
+    base = DB[:-3] if DB.endswith(".db") else DB
+    return f"{base}_{indice}de{num_shards}.db"
+
+
+# Devuelve la lista de archivos de todos los shards.
+def archivos_shards(num_shards=None):
+    num_shards = num_shards or NUM_SHARDS
+    return [archivo_shard(indice, num_shards) for indice in range(num_shards)]
+
+
+# Devuelve el numero de shard de un usuario. Usamos crc32 (y no hash()) porque da el mismo resultado en cada ejecucion de Python.
+def shard_de_usuario(user_id, num_shards=None):
+    return zlib.crc32(str(user_id).encode()) % (num_shards or NUM_SHARDS)
+
+
+# Devuelve el archivo donde estan las tareas del usuario.
+def archivo_de_usuario(user_id):
+    return archivo_shard(shard_de_usuario(user_id))
+
+
+# Funcion que crea la base de datos (todos los shards).
 def iniciar_bd():
-    with sqlite3.connect(DB, timeout=5) as conexion:
+    global NUM_SHARDS
+
+    # Volvemos a leer la cantidad de shards porque el .env se carga en crear_app(), despues de importar este modulo.
+    NUM_SHARDS = int(os.getenv("TAREAS_NUM_SHARDS", NUM_SHARDS))
+
+    for archivo in archivos_shards():
+        _iniciar_archivo(archivo)
+
+
+# Crea las tablas, el indice de busqueda y los triggers en un archivo de base de datos.
+# Si el archivo ya tiene la version actual del esquema no hace nada (una sola consulta).
+def _iniciar_archivo(archivo):
+    with sqlite3.connect(archivo, timeout=5) as conexion:
         cursor = conexion.cursor()
+
+        if cursor.execute("PRAGMA user_version").fetchone()[0] >= VERSION_ESQUEMA:
+            return
+
+        # Permite liberar de a poco las paginas que quedan vacias al archivar tareas (solo tiene efecto en bases de datos nuevas).
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
     
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS Tareas (
@@ -25,19 +103,73 @@ def iniciar_bd():
         ) 
         """)
 
+        # Verificamos si el indice de busqueda ya existia, si lo creamos ahora en una base de datos con tareas hay que llenarlo.
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'TareasBusqueda'")
+        indice_existia = cursor.fetchone() is not None
+
+        # Indice de busqueda de texto completo. No guarda una copia del texto, lo lee de la tabla Tareas (content='Tareas').
+        # Guarda tambien el user_id para que la busqueda de cada usuario use el indice y no recorra las tareas de todos.
+        cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS TareasBusqueda USING fts5(
+            tarea,
+            user_id,
+            content='Tareas',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """)
+
+        # Triggers que mantienen el indice sincronizado con la tabla Tareas.
+        # El de UPDATE solo se activa si cambia el texto o el usuario (marcar como completada no toca el indice).
+        cursor.executescript("""
+        CREATE TRIGGER IF NOT EXISTS tareas_busqueda_insert AFTER INSERT ON Tareas BEGIN
+            INSERT INTO TareasBusqueda (rowid, tarea, user_id) VALUES (new.id, new.tarea, new.user_id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS tareas_busqueda_delete AFTER DELETE ON Tareas BEGIN
+            INSERT INTO TareasBusqueda (TareasBusqueda, rowid, tarea, user_id) VALUES ('delete', old.id, old.tarea, old.user_id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS tareas_busqueda_update AFTER UPDATE OF tarea, user_id ON Tareas BEGIN
+            INSERT INTO TareasBusqueda (TareasBusqueda, rowid, tarea, user_id) VALUES ('delete', old.id, old.tarea, old.user_id);
+            INSERT INTO TareasBusqueda (rowid, tarea, user_id) VALUES (new.id, new.tarea, new.user_id);
+        END;
+        """)
+
+        # Las bases de datos creadas antes no tienen la columna fecha_completada, la agregamos.(Se usa para la retencion)
+        columnas = [columna[1] for columna in cursor.execute("PRAGMA table_info(Tareas)")]
+        if "fecha_completada" not in columnas:
+            cursor.execute("ALTER TABLE Tareas ADD COLUMN fecha_completada TEXT")
+
+        # Vencimiento como timestamp (segundos desde 1970, UTC). Es un entero para poder ordenarlo y buscar por rangos.
+        # No usamos la columna fecha_vencimiento porque es TEXT: sqlite guardaria los numeros como texto.
+        if "vencimiento" not in columnas:
+            cursor.execute("ALTER TABLE Tareas ADD COLUMN vencimiento INTEGER")
+
+        # Indice para las tareas pendientes de un usuario ordenadas por vencimiento.
+        # Las consultas de vencidas y por vencer recorren solo el rango que piden, sin leer las demas tareas.
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tareas_vencimiento ON Tareas (user_id, completada, vencimiento)")
+
+        if not indice_existia:
+            # El ranking solo tiene en cuenta el texto de la tarea (peso 0 para la columna user_id).
+            cursor.execute("INSERT INTO TareasBusqueda (TareasBusqueda, rank) VALUES ('rank', 'bm25(1.0, 0.0)')")
+            cursor.execute("INSERT INTO TareasBusqueda (TareasBusqueda) VALUES ('rebuild')")
+
+        cursor.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
         conexion.commit()
     
 
 
 # Funcion para agregar tarea en la base de datos.
-def agregar_tarea(user_id, tarea, fecha_vencimiento=None):
-    with sqlite3.connect(DB, timeout=5) as conexion:
+# 'vencimiento' es un timestamp UTC en segundos (o None si la tarea no vence).
+def agregar_tarea(user_id, tarea, vencimiento=None):
+    with sqlite3.connect(archivo_de_usuario(user_id), timeout=5) as conexion:
         cursor = conexion.cursor()
         fecha_creacion = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         cursor.execute("""
-        INSERT INTO Tareas (user_id, tarea, fecha_creacion, fecha_vencimiento) VALUES (?,?,?,?)
-    """, (user_id, tarea, fecha_creacion, fecha_vencimiento))
+        INSERT INTO Tareas (user_id, tarea, fecha_creacion, vencimiento) VALUES (?,?,?,?)
+    """, (user_id, tarea, fecha_creacion, vencimiento))
         
         conexion.commit()
     
@@ -45,36 +177,28 @@ def agregar_tarea(user_id, tarea, fecha_vencimiento=None):
 
 # Funcion que obtiene una lista de todas las tareas de un usuario.
 def obtener_tareas(user_id):
-    with sqlite3.connect(DB) as conexion:
-        conexion.row_factory = sqlite3.Row # Permite que cada fila que obtengamos se pueda acceder por el nombre de la columna, no solo por el indice.
+    with sqlite3.connect(archivo_de_usuario(user_id)) as conexion:
+        conexion.row_factory = Tarea.desde_fila # Cada fila se convierte directamente en un registro Tarea (una sola pasada).
         cursor = conexion.cursor()
 
-        # Consultamos todas las tareas que tenga el usuario(user_id).
-        cursor.execute("""
-        SELECT id, tarea, completada, fecha_creacion FROM Tareas WHERE user_id = ?
+        # Consultamos todas las tareas que tenga el usuario(user_id), solo con las columnas del registro y en su mismo orden.
+        # ORDER BY id: en el orden en que se crearon (sin el, sqlite las devuelve en el orden del indice de vencimientos).
+        cursor.execute(f"""
+        SELECT {Tarea.sql()} FROM Tareas WHERE user_id = ? ORDER BY id
     """, (user_id,))
-        
-        # Obtenemos todas las filas que cumplen la condicion de la consulta.(lista de tuplas)(Cada tupla = fila tabla, Cada fila tabla = tipo de objeto sqlite3.Row).
-        filas = cursor.fetchall()
-    
-        # Se recorre cada fila de la lista de tuplas(sqlite3.Row) y la convertimos a un diccionario.(Creamos una nueva lista pero de diccionarios)
-        tareas = [dict(fila) for fila in filas] 
-        
-        # Convertimos el valor de las columnas 'completadas' en un booleano.(Para no tener que adividar que significa 0 o 1).
-        for tarea in tareas:
-            tarea["completada"] = bool(tarea["completada"])
 
-        return tareas
+        # Lista de registros Tarea. Se envian como JSON sin convertirlos antes a diccionarios.
+        return cursor.fetchall()
 
 
 # Esta funcion marca una tarea por vez como completada.
 def marcar_completada(user_id, task_id):
-    with sqlite3.connect(DB, timeout=5) as conexion:
+    with sqlite3.connect(archivo_de_usuario(user_id), timeout=5) as conexion:
         cursor = conexion.cursor()
 
         cursor.execute("""
-        UPDATE Tareas SET completada = 1 WHERE id = ? AND user_id = ?
-        """, (task_id, user_id))
+        UPDATE Tareas SET completada = 1, fecha_completada = ? WHERE id = ? AND user_id = ?
+        """, (datetime.now().strftime(FORMATO_FECHA), task_id, user_id))
 
         conexion.commit()
         cambios = cursor.rowcount # obtiene el numero de filas modificadas.
@@ -86,7 +210,7 @@ def marcar_completada(user_id, task_id):
 # Funcion para elimina una tarea por vez.
 def eliminar_tarea(user_id, task_id):
 
-    with sqlite3.connect(DB, timeout=5) as conexion:
+    with sqlite3.connect(archivo_de_usuario(user_id), timeout=5) as conexion:
         cursor = conexion.cursor()
 
         cursor.execute("""
@@ -96,4 +220,313 @@ def eliminar_tarea(user_id, task_id):
         conexion.commit()
         cambios = cursor.rowcount # obtiene el numero de filas modificadas
     
-        return cambios > 0 # True si actualiza alguna fila. False si no.
\ No newline at end of file
+        return cambios > 0 # True si actualiza alguna fila. False si no.
+
+
+# Devuelve las tareas pendientes del usuario vencidas (vencimiento < ahora) y por vencer (ahora <= vencimiento < ahora + ventana),
+# ordenadas por vencimiento, como maximo 'limite' de cada una, y cuantas hay de cada tipo.
+# Todas las consultas son rangos sobre el indice (user_id, completada, vencimiento): no se leen las tareas sin vencimiento ni las completadas.
+def obtener_vencimientos(user_id, ahora, ventana, limite=50):
+    with sqlite3.connect(archivo_de_usuario(user_id)) as conexion:
+        conexion.row_factory = Tarea.desde_fila
+        cursor = conexion.cursor()
+
+        cursor.execute(f"""
+        SELECT {Tarea.sql()} FROM Tareas
+        WHERE user_id = ? AND completada = 0 AND vencimiento < ?
+        ORDER BY vencimiento LIMIT ?
+        """, (user_id, ahora, limite))
+        vencidas = cursor.fetchall()
+
+        cursor.execute(f"""
+        SELECT {Tarea.sql()} FROM Tareas
+        WHERE user_id = ? AND completada = 0 AND vencimiento >= ? AND vencimiento < ?
+        ORDER BY vencimiento LIMIT ?
+        """, (user_id, ahora, ahora + ventana, limite))
+        por_vencer = cursor.fetchall()
+
+        # Los totales se cuentan solo con el indice (no lee las filas de la tabla).
+        conexion.row_factory = None
+        cursor = conexion.cursor()
+
+        cursor.execute("SELECT COUNT(*) FROM Tareas WHERE user_id = ? AND completada = 0", (user_id,))
+        pendientes = cursor.fetchone()[0]
+
+        cursor.execute("SELECT COUNT(*) FROM Tareas WHERE user_id = ? AND completada = 0 AND vencimiento < ?", (user_id, ahora))
+        total_vencidas = cursor.fetchone()[0]
+
+        cursor.execute("""
+        SELECT COUNT(*) FROM Tareas WHERE user_id = ? AND completada = 0 AND vencimiento >= ? AND vencimiento < ?
+        """, (user_id, ahora, ahora + ventana))
+        total_por_vencer = cursor.fetchone()[0]
+
+        return {
+            "vencidas": vencidas,
+            "por_vencer": por_vencer,
+            "totales": {"pendientes": pendientes, "vencidas": total_vencidas, "por_vencer": total_por_vencer},
+        }
+
+
+# Convierte el texto que escribio el usuario en una consulta FTS5 segura.
+# Cada palabra se busca entre comillas (asi no se interpretan operadores) y las que terminan en '*' se buscan como prefijo.
+def _consulta_busqueda(texto):
+    terminos = []
+
+    for palabra in texto.split():
+        prefijo = palabra.endswith("*")
+        palabra = palabra.rstrip("*").replace('"', "")
+
+        if palabra:
+            terminos.append(f'"{palabra}"*' if prefijo else f'"{palabra}"')
+
+    return " ".join(terminos)
+
+
+# Busca tareas del usuario por su texto usando el indice FTS5. Devuelve una lista de tareas ordenadas por relevancia.
+def buscar_tareas(user_id, texto, limite=20, desplazamiento=0):
+
+    consulta = _consulta_busqueda(texto)
+    if not consulta:
+        return []
+
+    with sqlite3.connect(archivo_de_usuario(user_id)) as conexion:
+        conexion.row_factory = Tarea.desde_fila
+        cursor = conexion.cursor()
+
+        # Filtramos por user_id dentro del MATCH, asi el indice devuelve solo las tareas de ese usuario.
+        cursor.execute(f"""
+        SELECT {Tarea.sql("t.")}
+        FROM TareasBusqueda
+        JOIN Tareas t ON t.id = TareasBusqueda.rowid
+        WHERE TareasBusqueda MATCH ?
+        ORDER BY rank
+        LIMIT ? OFFSET ?
+        """, (f'user_id : "{str(user_id).replace(chr(34), "")}" AND tarea : ({consulta})', limite, desplazamiento))
+
+        return cursor.fetchall()
+
+
+# Vuelve a construir el indice de busqueda desde la tabla Tareas (para bases de datos que ya tenian tareas o si el indice se dania).
+# Devuelve la cantidad de tareas indexadas en todos los shards.
+def reconstruir_indice_busqueda():
+    total = 0
+
+    for archivo in archivos_shards():
+        with sqlite3.connect(archivo, timeout=5) as conexion:
+            cursor = conexion.cursor()
+            cursor.execute("INSERT INTO TareasBusqueda (TareasBusqueda) VALUES ('rebuild')")
+            conexion.commit()
+
+            cursor.execute("SELECT COUNT(*) FROM Tareas")
+            total += cursor.fetchone()[0]
+
+    return total
+
+
+
+# =========
+# RETENCION
+# =========
+
+# Mueve las tareas completadas hace mas de 'dias' dias a la base de datos de archivo (de todos los shards, uno por vez).
+# Trabaja en lotes pequenhos, cada lote es una transaccion corta, asi nunca bloquea la escritura de la base de datos por mucho tiempo.
+# Con simular=True solo cuenta cuantas tareas se moverian. Devuelve un diccionario con las estadisticas.
+def archivar_tareas_completadas(dias, lote=500, simular=False, pausa=0.05):
+
+    fecha_limite = (datetime.now() - timedelta(days=dias)).strftime(FORMATO_FECHA)
+    estadisticas = {"fecha_limite": fecha_limite, "candidatas": 0, "archivadas": 0, "lotes": 0, "shards": []}
+
+    for archivo in archivos_shards():
+        estadisticas_shard = _archivar_shard(archivo, fecha_limite, lote, simular, pausa)
+
+        estadisticas["candidatas"] += estadisticas_shard["candidatas"]
+        estadisticas["archivadas"] += estadisticas_shard["archivadas"]
+        estadisticas["lotes"] += estadisticas_shard["lotes"]
+        estadisticas["shards"].append(estadisticas_shard)
+
+    return estadisticas
+
+
+# Archiva las tareas completadas antes de 'fecha_limite' de un solo archivo de base de datos.
+def _archivar_shard(archivo, fecha_limite, lote, simular, pausa):
+
+    # Las tareas completadas antes de que existiera la columna fecha_completada usan su fecha de creacion.
+    condicion = "completada = 1 AND COALESCE(fecha_completada, fecha_creacion) < ?"
+
+    estadisticas = {"base_de_datos": archivo, "candidatas": 0, "archivadas": 0, "lotes": 0}
+
+    # isolation_level=None: nosotros manejamos las transacciones (BEGIN / COMMIT) de cada lote.
+    conexion = sqlite3.connect(archivo, timeout=5, isolation_level=None)
+    cursor = conexion.cursor()
+
+    try:
+        cursor.execute(f"SELECT COUNT(*) FROM Tareas WHERE {condicion}", (fecha_limite,))
+        estadisticas["candidatas"] = cursor.fetchone()[0]
+
+        if simular or estadisticas["candidatas"] == 0:
+            return estadisticas
+
+        # Los id se repiten entre shards, por eso el archivo guarda su propio id y el shard de origen.
+        cursor.execute("ATTACH DATABASE ? AS archivo", (DB_ARCHIVO,))
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS archivo.TareasArchivo (
+            id_archivo INTEGER PRIMARY KEY AUTOINCREMENT,
+            id INTEGER NOT NULL,
+            base_de_datos TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            tarea TEXT NOT NULL,
+            fecha_creacion TEXT NOT NULL,
+            fecha_vencimiento TEXT,
+            completada INTEGER,
+            fecha_completada TEXT,
+            fecha_archivado TEXT NOT NULL,
+            vencimiento INTEGER
+        )
+        """)
+
+        # Los archivos creados antes no tienen la columna vencimiento.
+        columnas_archivo = [columna[1] for columna in cursor.execute("PRAGMA archivo.table_info(TareasArchivo)")]
+        if "vencimiento" not in columnas_archivo:
+            cursor.execute("ALTER TABLE archivo.TareasArchivo ADD COLUMN vencimiento INTEGER")
+
+        ultimo_id = 0 # Recorremos por id (clave primaria) para no volver a leer las filas ya revisadas.
+
+        while True:
+            cursor.execute("BEGIN IMMEDIATE")
+
+            cursor.execute(f"SELECT id FROM Tareas WHERE id > ? AND {condicion} ORDER BY id LIMIT ?", (ultimo_id, fecha_limite, lote))
+            ids = [fila[0] for fila in cursor.fetchall()]
+
+            if not ids:
+                cursor.execute("COMMIT")
+                break
+
+            marcadores = ",".join("?" * len(ids))
+            cursor.execute(f"""
+            INSERT INTO archivo.TareasArchivo
+                (id, base_de_datos, user_id, tarea, fecha_creacion, fecha_vencimiento, completada, fecha_completada, fecha_archivado, vencimiento)
+            SELECT id, ?, user_id, tarea, fecha_creacion, fecha_vencimiento, completada, fecha_completada, ?, vencimiento
+            FROM Tareas WHERE id IN ({marcadores})
+            """, (archivo, datetime.now().strftime(FORMATO_FECHA), *ids))
+
+            # El trigger de borrado tambien saca estas tareas del indice de busqueda.
+            cursor.execute(f"DELETE FROM Tareas WHERE id IN ({marcadores})", ids)
+            cursor.execute("COMMIT")
+
+            estadisticas["archivadas"] += len(ids)
+            estadisticas["lotes"] += 1
+            ultimo_id = ids[-1]
+
+            time.sleep(pausa) # Dejamos pasar a las escrituras del microservicio entre lote y lote.
+
+        cursor.execute("DETACH DATABASE archivo")
+        estadisticas.update(vacuum.vacuum_incremental(conexion))
+        return estadisticas
+
+    finally:
+        conexion.close()
+
+
+# Activa auto_vacuum INCREMENTAL en las bases de datos existentes. Reescribe todo el archivo (VACUUM), usar fuera de horario.
+def activar_vacuum_incremental():
+    for archivo in archivos_shards():
+        vacuum.activar_vacuum_incremental(archivo)
+
+
+
+# ============================
+# ADMINISTRACION DE LOS SHARDS
+# ============================
+
+# Cuenta las tareas de un shard. (total, completadas, usuarios)
+def _contar_shard(archivo):
+    with sqlite3.connect(archivo) as conexion:
+        cursor = conexion.cursor()
+        cursor.execute("SELECT COUNT(*), COALESCE(SUM(completada), 0), COUNT(DISTINCT user_id) FROM Tareas")
+        total, completadas, usuarios = cursor.fetchone()
+        return {"base_de_datos": archivo, "tareas": total, "completadas": completadas, "usuarios": usuarios}
+
+
+# Estadisticas de todas las tareas. Consulta todos los shards en paralelo (fan-out) y suma los resultados.
+# Los usuarios se pueden sumar porque cada usuario esta en un solo shard.
+def estadisticas_globales():
+    from concurrent.futures import ThreadPoolExecutor # Solo lo usan los comandos de administracion.
+
+    archivos = archivos_shards()
+
+    with ThreadPoolExecutor(max_workers=len(archivos)) as ejecutor:
+        por_shard = list(ejecutor.map(_contar_shard, archivos))
+
+    return {
+        "shards": len(archivos),
+        "tareas": sum(shard["tareas"] for shard in por_shard),
+        "completadas": sum(shard["completadas"] for shard in por_shard),
+        "usuarios": sum(shard["usuarios"] for shard in por_shard),
+        "por_shard": por_shard,
+    }
+
+
+# Copia todas las tareas de los shards actuales (NUM_SHARDS) a 'nuevo_num_shards' archivos nuevos, segun el shard de cada usuario.
+# Se debe ejecutar con el microservicio detenido. Los archivos viejos no se borran.
+# Los shards nuevos deben estar vacios: si ya tienen tareas (por una migracion anterior) se rechaza, para no duplicarlas.
+# Se conserva el id de cada tarea. Si el id ya existe en el shard nuevo (vienen de shards distintos), la tarea recibe un id nuevo
+# y los clientes la ven con ese id nuevo ('ids_reasignados' cuenta cuantas cambiaron).
+def reshardear(nuevo_num_shards, lote=1000):
+
+    origenes = archivos_shards()
+    destinos = archivos_shards(nuevo_num_shards)
+
+    if set(origenes) & set(destinos):
+        raise ValueError("El numero de shards nuevo debe ser distinto del actual")
+
+    # Nos aseguramos de que los shards viejos tengan todas las columnas y creamos los nuevos.
+    iniciar_bd()
+    for archivo in destinos:
+        _iniciar_archivo(archivo)
+
+    con_tareas = [shard["base_de_datos"] for shard in map(_contar_shard, destinos) if shard["tareas"]]
+    if con_tareas:
+        raise ValueError(f"Los shards nuevos ya tienen tareas ({', '.join(con_tareas)}). "
+                         "Hay que borrarlos o moverlos antes de reshardear, si no las tareas quedarian duplicadas")
+
+    estadisticas = {"shards_origen": len(origenes), "shards_destino": nuevo_num_shards,
+                    "tareas_migradas": 0, "ids_reasignados": 0, "por_shard": [0] * nuevo_num_shards}
+
+    conexiones = [sqlite3.connect(archivo, timeout=5) for archivo in destinos]
+
+    try:
+        for origen in origenes:
+            with sqlite3.connect(origen) as conexion_origen:
+                cursor = conexion_origen.execute("SELECT * FROM Tareas ORDER BY id")
+                columnas = [descripcion[0] for descripcion in cursor.description]
+                posicion_usuario = columnas.index("user_id")
+
+                insertar_con_id = f"INSERT INTO Tareas ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})"
+                insertar_sin_id = f"INSERT INTO Tareas ({', '.join(columnas[1:])}) VALUES ({', '.join('?' * (len(columnas) - 1))})"
+
+                # Leemos de a 'lote' filas para no cargar todo el shard en memoria.
+                while True:
+                    filas = cursor.fetchmany(lote)
+                    if not filas:
+                        break
+
+                    for fila in filas:
+                        indice = shard_de_usuario(fila[posicion_usuario], nuevo_num_shards)
+
+                        try:
+                            conexiones[indice].execute(insertar_con_id, fila)
+                        except sqlite3.IntegrityError:
+                            conexiones[indice].execute(insertar_sin_id, fila[1:]) # La columna id es la primera.
+                            estadisticas["ids_reasignados"] += 1
+
+                        estadisticas["por_shard"][indice] += 1
+                        estadisticas["tareas_migradas"] += 1
+
+                    for conexion in conexiones:
+                        conexion.commit()
+
+    finally:
+        for conexion in conexiones:
+            conexion.close()
+
+    return estadisticas